@@ -1,13 +1,16 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Query, Response
+from fastapi.responses import StreamingResponse, JSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import json
+import math
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Literal
 import uuid
 from datetime import datetime, timezone
 
@@ -16,7 +19,14 @@ from services.agent_service import AgentService
 from services.solana_service import SolanaService
 from services.audit_service import AuditService
 from services.auth_service import AuthService
-from services.swap_service import SwapService
+from services.swap_service import SwapService, SOL_MINT
+from services.confirmation_tracker import ConfirmationTracker, UNCONFIRMED_STATUSES
+from services.index_manager import IndexManager
+from services.spend_ledger import SpendLedger
+from services.crypto_executor import CryptoExecutor
+from services.account_mirror import AccountMirror
+from services.event_hub import EventHub, ALL_TOPICS, encode_event
+from services.rpc_pool import RpcError, RpcRateLimitedError
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -29,17 +39,37 @@ app = FastAPI()
 api_router = APIRouter(prefix="/api")
 security = HTTPBearer(auto_error=False)
 
-wallet_service = WalletService(db)
+crypto_executor = CryptoExecutor.from_env()
+wallet_service = WalletService(db, crypto_executor)
 agent_service = AgentService(db, wallet_service)
 solana_service = SolanaService()
 audit_service = AuditService(db)
-auth_service = AuthService(db)
-swap_service = SwapService()
+auth_service = AuthService(db, crypto_executor)
+swap_service = SwapService(fee_estimator=solana_service.fee_estimator)
+spend_ledger = SpendLedger(db, wallet_service)
+account_mirror = AccountMirror.from_env(db, solana_service)
+solana_service.account_mirror = account_mirror
+event_hub = EventHub(queue_size=int(os.environ.get('EVENT_QUEUE_SIZE', 256)))
+index_manager = IndexManager(
+    db,
+    [wallet_service, agent_service, audit_service, auth_service, spend_ledger]
+)
+confirmation_tracker = ConfirmationTracker(
+    solana_service,
+    audit_service,
+    poll_interval=float(os.environ.get('CONFIRMATION_POLL_INTERVAL', 1.0))
+)
 
 class WalletCreateRequest(BaseModel):
     name: str
     key_management_type: str = "encrypted"  # encrypted or ephemeral
 
+class WalletBulkCreateRequest(BaseModel):
+    count: int = Field(..., gt=0, le=100000)
+    name_prefix: str
+    key_management_type: str = "encrypted"
+    chunk_size: int = Field(500, gt=0, le=5000)
+
 class WalletResponse(BaseModel):
     model_config = ConfigDict(extra="ignore")
     wallet_id: str
@@ -60,11 +90,36 @@ class AgentExecuteRequest(BaseModel):
     action_type: str  # transfer, swap, etc.
     params: Dict[str, Any]
 
+class AgentBatchExecuteRequest(BaseModel):
+    actions: List[AgentExecuteRequest]
+    max_concurrency: Optional[int] = Field(None, ge=1, le=256)
+
+class PolicyActionCandidate(BaseModel):
+    action_type: str
+    params: Dict[str, Any]
+
+class PolicyEvaluateRequest(BaseModel):
+    actions: List[PolicyActionCandidate]
+
 class TransactionRequest(BaseModel):
     wallet_id: str
     to_address: str
-    amount: float
+    amount: float = Field(..., gt=0)
     simulate_only: bool = False
+    wait_for_confirmation: bool = True
+    commitment: Literal["processed", "confirmed", "finalized"] = "confirmed"
+    urgency: Optional[Literal["none", "low", "medium", "high", "urgent"]] = None
+
+class PayoutRecipient(BaseModel):
+    to_address: str
+    amount: float = Field(..., gt=0)
+
+class BatchTransferRequest(BaseModel):
+    wallet_id: str
+    recipients: List[PayoutRecipient] = Field(..., min_length=1)
+    wait_for_confirmation: bool = True
+    commitment: Literal["processed", "confirmed", "finalized"] = "confirmed"
+    urgency: Optional[Literal["none", "low", "medium", "high", "urgent"]] = None
 
 class PolicyUpdateRequest(BaseModel):
     wallet_id: str
@@ -89,6 +144,8 @@ class SwapQuoteRequest(BaseModel):
     output_mint: str
     amount: float
     token_decimals: int = 9
+    slippage_bps: int = 50
+    indicative: bool = False
 
 class SwapExecuteRequest(BaseModel):
     wallet_id: str
@@ -96,6 +153,9 @@ class SwapExecuteRequest(BaseModel):
     output_mint: str
     amount: float
     slippage_bps: int = 50
+    wait_for_confirmation: bool = True
+    commitment: Literal["processed", "confirmed", "finalized"] = "confirmed"
+    urgency: Optional[Literal["none", "low", "medium", "high", "urgent"]] = None
 
 async def get_current_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
@@ -142,24 +202,89 @@ async def create_wallet(request: WalletCreateRequest):
             request.name,
             request.key_management_type
         )
-        balance = await solana_service.get_balance(wallet["pubkey"])
-        wallet["balances"] = {"SOL": balance}
+        if account_mirror:
+            await account_mirror.watch([wallet["pubkey"]])
+        # A freshly generated keypair has no lamports, so skip the RPC round trip
+        wallet["balances"] = {"SOL": 0.0}
         return WalletResponse(**wallet)
     except Exception as e:
         logging.error(f"Error creating wallet: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.post("/wallets/bulk")
+async def provision_wallets(request: WalletBulkCreateRequest):
+    async def ndjson():
+        try:
+            async for progress in wallet_service.provision_wallets(
+                request.count,
+                request.name_prefix,
+                request.key_management_type,
+                chunk_size=request.chunk_size
+            ):
+                if account_mirror:
+                    await account_mirror.watch(wallet["pubkey"] for wallet in progress["wallets"])
+                yield json.dumps(progress) + "\n"
+        except Exception as e:
+            logging.error(f"Error provisioning wallets: {e}")
+            yield json.dumps({"error": str(e)}) + "\n"
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
 @api_router.get("/wallets", response_model=List[WalletResponse])
-async def get_wallets():
-    wallets = await wallet_service.get_all_wallets()
+async def get_wallets(response: Response, limit: int = Query(1000, ge=1, le=1000)):
+    # Newest wallets only; X-Next-Cursor continues the listing at /wallets/page
+    page = await wallet_service.get_wallets_page(limit=limit)
+    if page["next_cursor"]:
+        response.headers["X-Next-Cursor"] = page["next_cursor"]
+    wallets = page["wallets"]
+    balances = await solana_service.get_balances([w["pubkey"] for w in wallets])
     for wallet in wallets:
-        try:
-            balance = await solana_service.get_balance(wallet["pubkey"])
-            wallet["balances"] = {"SOL": balance}
-        except:
-            wallet["balances"] = {"SOL": 0}
+        wallet["balances"] = {"SOL": balances.get(wallet["pubkey"], 0.0)}
     return wallets
 
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    return [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+
+@api_router.get("/wallets/page")
+async def get_wallets_page(
+    name_prefix: Optional[str] = None,
+    key_management_type: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None
+):
+    try:
+        return await wallet_service.get_wallets_page(
+            name_prefix,
+            key_management_type,
+            _parse_fields(fields),
+            limit,
+            cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@api_router.get("/wallets/export")
+async def export_wallets(
+    name_prefix: Optional[str] = None,
+    key_management_type: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return")
+):
+    try:
+        wallets = wallet_service.stream_wallets(name_prefix, key_management_type, _parse_fields(fields))
+        first = await anext(wallets, None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async def ndjson():
+        if first is None:
+            return
+        yield json.dumps(first) + "\n"
+        async for wallet in wallets:
+            yield json.dumps(wallet) + "\n"
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
 @api_router.get("/wallets/{wallet_id}", response_model=WalletResponse)
 async def get_wallet(wallet_id: str):
     wallet = await wallet_service.get_wallet(wallet_id)
@@ -169,19 +294,28 @@ async def get_wallet(wallet_id: str):
     wallet["balances"] = {"SOL": balance}
     return WalletResponse(**wallet)
 
+def _rpc_error_result(error: RpcError) -> Dict[str, Any]:
+    """Audit result for an attempt that ended in ``RpcError``"""
+    result = {"success": False, "error": str(error)}
+    if error.signature:
+        # The send may have landed; the confirmation tracker settles the entry
+        result["signature"] = error.signature
+        result["confirmation_status"] = "unknown"
+    return result
+
 @api_router.post("/wallets/{wallet_id}/fund")
 async def fund_wallet(wallet_id: str):
     wallet = await wallet_service.get_wallet(wallet_id)
     if not wallet:
         raise HTTPException(status_code=404, detail="Wallet not found")
     
-    result = await solana_service.request_airdrop(wallet["pubkey"])
-    await audit_service.log_action(
-        wallet_id,
-        "airdrop",
-        {"pubkey": wallet["pubkey"], "amount": 1},
-        result
-    )
+    audit_params = {"pubkey": wallet["pubkey"], "amount": 1}
+    try:
+        result = await solana_service.request_airdrop(wallet["pubkey"])
+    except RpcError as e:
+        await audit_service.log_action(wallet_id, "airdrop", audit_params, _rpc_error_result(e))
+        raise
+    await audit_service.log_action(wallet_id, "airdrop", audit_params, result)
     return result
 
 @api_router.post("/transactions/transfer")
@@ -198,35 +332,196 @@ async def transfer_sol(request: TransactionRequest):
         )
         return {"simulation": result, "executed": False}
     
-    keypair = await wallet_service.get_keypair(request.wallet_id)
-    result = await solana_service.transfer_sol(
-        keypair,
-        request.to_address,
-        request.amount
-    )
+    audit_params = {"to": request.to_address, "amount": request.amount}
+    pubkeys = [wallet["pubkey"], request.to_address]
+    reservation = await spend_ledger.reserve(request.wallet_id, request.amount)
+    if not reservation["allowed"]:
+        result = {"success": False, "error": reservation["reason"], "daily_spend": reservation}
+    else:
+        try:
+            keypair = await wallet_service.get_keypair(request.wallet_id)
+            result = await solana_service.transfer_sol(
+                keypair,
+                request.to_address,
+                request.amount,
+                commitment=request.commitment,
+                wait_for_confirmation=request.wait_for_confirmation,
+                urgency=request.urgency
+            )
+        except RpcError as e:
+            await audit_service.log_action(request.wallet_id, "transfer", audit_params, _rpc_error_result(e))
+            if e.signature:
+                # Keep the reservation until the tracker knows whether the send landed
+                confirmation_tracker.track(
+                    e.signature,
+                    request.commitment,
+                    pubkeys,
+                    on_failed=lambda: spend_ledger.release(reservation)
+                )
+            else:
+                await spend_ledger.release(reservation)
+            raise
+        except BaseException:
+            await spend_ledger.release(reservation)
+            raise
+        if not result.get("success"):
+            await spend_ledger.release(reservation)
     
-    await audit_service.log_action(
-        request.wallet_id,
-        "transfer",
-        {"to": request.to_address, "amount": request.amount},
-        result
+    await audit_service.log_action(request.wallet_id, "transfer", audit_params, result)
+    
+    if result.get("success") and result["confirmation_status"] in UNCONFIRMED_STATUSES:
+        confirmation_tracker.track(
+            result["signature"],
+            request.commitment,
+            pubkeys,
+            on_failed=lambda: spend_ledger.release(reservation)
+        )
+    
+    return result
+
+@api_router.post("/transactions/batch-transfer")
+async def batch_transfer_sol(request: BatchTransferRequest):
+    wallet = await wallet_service.get_wallet(request.wallet_id)
+    if not wallet:
+        raise HTTPException(status_code=404, detail="Wallet not found")
+    
+    total_amount = sum(recipient.amount for recipient in request.recipients)
+    audit_params = {
+        "recipients": [
+            {"to": recipient.to_address, "amount": recipient.amount}
+            for recipient in request.recipients
+        ],
+        "total_amount": total_amount
+    }
+    
+    reservation = await spend_ledger.reserve(request.wallet_id, total_amount)
+    if not reservation["allowed"]:
+        result = {"success": False, "error": reservation["reason"], "daily_spend": reservation}
+        await audit_service.log_action(request.wallet_id, "batch_transfer", audit_params, result)
+        return result
+    
+    try:
+        keypair = await wallet_service.get_keypair(request.wallet_id)
+        result = await solana_service.batch_transfer_sol(
+            keypair,
+            [(recipient.to_address, recipient.amount) for recipient in request.recipients],
+            commitment=request.commitment,
+            wait_for_confirmation=request.wait_for_confirmation,
+            urgency=request.urgency
+        )
+    except RpcError as e:
+        # Raised only when no transaction was sent or may have landed
+        await spend_ledger.release(reservation)
+        await audit_service.log_action(request.wallet_id, "batch_transfer", audit_params, _rpc_error_result(e))
+        raise
+    except BaseException:
+        await spend_ledger.release(reservation)
+        raise
+    
+    # Sends that may have landed keep their share until the tracker settles them
+    failed_amount = sum(
+        r["amount"] for r in result["recipients"] if not r["success"] and not r.get("signature")
     )
+    if failed_amount:
+        await spend_ledger.release({
+            **reservation,
+            "reserved_lamports": int(round(failed_amount * 1_000_000_000))
+        })
+    
+    await audit_service.log_action(request.wallet_id, "batch_transfer", audit_params, result)
+    
+    for transaction in result["transactions"]:
+        if not transaction.get("signature"):
+            continue
+        if transaction["success"] and transaction["confirmation_status"] not in UNCONFIRMED_STATUSES:
+            continue
+        partial = {
+            **reservation,
+            "reserved_lamports": int(round(transaction["amount"] * 1_000_000_000))
+        }
+        confirmation_tracker.track(
+            transaction["signature"],
+            request.commitment,
+            [wallet["pubkey"], *transaction["recipients"]],
+            on_failed=lambda partial=partial: spend_ledger.release(partial)
+        )
     
     return result
 
+@api_router.get("/transactions/{signature}/status")
+async def get_transaction_status(signature: str):
+    status = confirmation_tracker.get_status(signature)
+    if status:
+        return status
+    return await solana_service.get_signature_status(signature)
+
 @api_router.post("/agents", response_model=Dict[str, Any])
 async def create_agent(request: AgentCreateRequest):
-    agent = await agent_service.create_agent(
-        request.name,
-        request.agent_type,
-        request.wallet_id,
-        request.policy
-    )
+    try:
+        agent = await agent_service.create_agent(
+            request.name,
+            request.agent_type,
+            request.wallet_id,
+            request.policy
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return agent
 
 @api_router.get("/agents", response_model=List[Dict[str, Any]])
-async def get_agents():
-    return await agent_service.get_all_agents()
+async def get_agents(response: Response, limit: int = Query(1000, ge=1, le=1000)):
+    page = await agent_service.get_agents_page(limit=limit)
+    if page["next_cursor"]:
+        response.headers["X-Next-Cursor"] = page["next_cursor"]
+    return page["agents"]
+
+@api_router.get("/agents/page")
+async def get_agents_page(
+    name_prefix: Optional[str] = None,
+    agent_type: Optional[str] = None,
+    status: Optional[str] = None,
+    wallet_id: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None
+):
+    try:
+        return await agent_service.get_agents_page(
+            name_prefix,
+            agent_type,
+            status,
+            wallet_id,
+            _parse_fields(fields),
+            limit,
+            cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@api_router.get("/agents/export")
+async def export_agents(
+    name_prefix: Optional[str] = None,
+    agent_type: Optional[str] = None,
+    status: Optional[str] = None,
+    wallet_id: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return")
+):
+    try:
+        agents = agent_service.stream_agents(
+            name_prefix, agent_type, status, wallet_id, _parse_fields(fields)
+        )
+        first = await anext(agents, None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async def ndjson():
+        if first is None:
+            return
+        yield json.dumps(first) + "\n"
+        async for agent in agents:
+            yield json.dumps(agent) + "\n"
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
 
 @api_router.post("/agents/execute")
 async def execute_agent_action(request: AgentExecuteRequest):
@@ -237,10 +532,143 @@ async def execute_agent_action(request: AgentExecuteRequest):
     )
     return result
 
+@api_router.post("/agents/execute/batch")
+async def execute_agent_actions_batch(request: AgentBatchExecuteRequest):
+    results = await agent_service.execute_batch(
+        [(action.agent_id, action.action_type, action.params) for action in request.actions],
+        request.max_concurrency
+    )
+    return {"results": results}
+
+@api_router.post("/agents/{agent_id}/policy/evaluate")
+async def evaluate_agent_policy(agent_id: str, request: PolicyEvaluateRequest):
+    try:
+        results = await agent_service.evaluate_policy_batch(
+            agent_id,
+            [(action.action_type, action.params) for action in request.actions]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"results": results}
+
+@api_router.get("/cache/stats")
+async def get_cache_stats():
+    return {
+        "balances": solana_service.balance_cache.stats(),
+        "swap_quotes": swap_service.quote_cache.stats(),
+        "priority_fees": solana_service.fee_estimator.stats(),
+        "account_mirror": account_mirror.stats() if account_mirror else None,
+        "keypairs": wallet_service.keypair_cache.stats(),
+        "api_keys": auth_service.api_key_stats(),
+        "llm_decisions": agent_service.decision_cache.stats(),
+        "blockhash": {
+            "hits": solana_service.blockhash_provider.cache_hits,
+            "inline_fetches": solana_service.blockhash_provider.inline_fetches,
+            "last_valid_block_height": solana_service.blockhash_provider.last_valid_block_height
+        }
+    }
+
+@api_router.get("/events")
+async def stream_events(
+    wallet_ids: Optional[str] = Query(None, description="Comma-separated wallet ids to follow; all wallets if omitted")
+):
+    ids = list(dict.fromkeys(wallet_id.strip() for wallet_id in (wallet_ids or "").split(",") if wallet_id.strip()))
+    if len(ids) > 100:
+        raise HTTPException(status_code=400, detail="Provide at most 100 wallet ids")
+    
+    wallets = await wallet_service.get_wallets_by_ids(ids) if ids else []
+    found = {wallet["wallet_id"] for wallet in wallets}
+    missing = [wallet_id for wallet_id in ids if wallet_id not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Wallet {missing[0]} not found")
+    
+    heartbeat = float(os.environ.get('EVENT_HEARTBEAT_INTERVAL', 15))
+    
+    async def sse():
+        # Subscribed here so the finally below always runs, even if the
+        # response is never iterated; audit events are keyed by wallet id,
+        # balance and confirmation events by pubkey
+        topics = ids + [wallet["pubkey"] for wallet in wallets] if ids else [ALL_TOPICS]
+        subscription = event_hub.subscribe(topics)
+        try:
+            try:
+                balances = await solana_service.get_balances([wallet["pubkey"] for wallet in wallets])
+            except RpcError:
+                balances = {}
+            yield encode_event("snapshot", {
+                "wallets": [
+                    {
+                        "wallet_id": wallet["wallet_id"],
+                        "pubkey": wallet["pubkey"],
+                        "balance": balances.get(wallet["pubkey"])
+                    }
+                    for wallet in wallets
+                ]
+            })
+            while True:
+                frame = await subscription.get(heartbeat)
+                if subscription.dropped:
+                    yield encode_event("lagged", {"dropped": subscription.dropped})
+                    subscription.dropped = 0
+                yield frame if frame is not None else ": keepalive\n\n"
+        finally:
+            event_hub.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        sse(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.get("/events/stats")
+async def get_event_stats():
+    return event_hub.stats()
+
+@api_router.get("/rpc/endpoints")
+async def get_rpc_endpoints():
+    return {"endpoints": solana_service.client.stats()}
+
 @api_router.get("/audit/logs", response_model=List[Dict[str, Any]])
 async def get_audit_logs(wallet_id: Optional[str] = None, limit: int = 100):
     return await audit_service.get_logs(wallet_id, limit)
 
+@api_router.get("/audit/logs/page")
+async def get_audit_logs_page(
+    wallet_id: Optional[str] = None,
+    action_type: Optional[str] = None,
+    success: Optional[bool] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None
+):
+    try:
+        return await audit_service.get_logs_page(
+            wallet_id,
+            action_type,
+            success,
+            since,
+            until,
+            limit,
+            cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@api_router.get("/audit/logs/export")
+async def export_audit_logs(
+    wallet_id: Optional[str] = None,
+    action_type: Optional[str] = None,
+    success: Optional[bool] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    async def ndjson():
+        async for log in audit_service.stream_logs(wallet_id, action_type, success, since, until):
+            yield json.dumps(log, default=str) + "\n"
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
 @api_router.post("/policies")
 async def update_policy(request: PolicyUpdateRequest):
     result = await wallet_service.update_policy(
@@ -248,6 +676,7 @@ async def update_policy(request: PolicyUpdateRequest):
         request.max_daily_spend,
         request.allowed_actions
     )
+    spend_ledger.invalidate_limit(request.wallet_id)
     return result
 
 @api_router.get("/policies/{wallet_id}")
@@ -257,6 +686,10 @@ async def get_policy(wallet_id: str):
         raise HTTPException(status_code=404, detail="Policy not found")
     return policy
 
+@api_router.get("/policies/{wallet_id}/spend")
+async def get_daily_spend(wallet_id: str):
+    return await spend_ledger.get_daily_spend(wallet_id)
+
 @api_router.post("/auth/register")
 async def register(request: UserRegisterRequest):
     try:
@@ -325,7 +758,9 @@ async def get_swap_quote(request: SwapQuoteRequest):
             request.input_mint,
             request.output_mint,
             request.amount,
-            request.token_decimals
+            request.token_decimals,
+            slippage_bps=request.slippage_bps,
+            indicative=request.indicative
         )
         return result
     except Exception as e:
@@ -342,46 +777,94 @@ async def execute_swap(request: SwapExecuteRequest):
         quote_result = await swap_service.simulate_swap(
             request.input_mint,
             request.output_mint,
-            request.amount
+            request.amount,
+            slippage_bps=request.slippage_bps
         )
         
         if not quote_result.get("valid"):
             return {"success": False, "error": "Invalid swap quote"}
         
-        keypair = await wallet_service.get_keypair(request.wallet_id)
+        # Only SOL-denominated swaps count towards the daily SOL spend limit
+        reservation = {"allowed": True}
+        if request.input_mint == SOL_MINT:
+            reservation = await spend_ledger.reserve(request.wallet_id, request.amount)
+            if not reservation["allowed"]:
+                return {"success": False, "error": reservation["reason"], "daily_spend": reservation}
         
-        result = await solana_service.interact_with_protocol(
-            keypair,
-            "memo",
-            {
-                "memo": f"Simulated Swap: {request.amount} {request.input_mint} to {request.output_mint}"
-            }
-        )
+        audit_params = {
+            "input_mint": request.input_mint,
+            "output_mint": request.output_mint,
+            "amount": request.amount
+        }
+        try:
+            keypair = await wallet_service.get_keypair(request.wallet_id)
+            
+            result = await solana_service.interact_with_protocol(
+                keypair,
+                "memo",
+                {
+                    "memo": f"Simulated Swap: {request.amount} {request.input_mint} to {request.output_mint}"
+                },
+                commitment=request.commitment,
+                wait_for_confirmation=request.wait_for_confirmation,
+                urgency=request.urgency
+            )
+        except RpcError as e:
+            await audit_service.log_action(request.wallet_id, "swap", audit_params, _rpc_error_result(e))
+            if e.signature:
+                # Keep the reservation until the tracker knows whether the send landed
+                confirmation_tracker.track(
+                    e.signature,
+                    request.commitment,
+                    [wallet["pubkey"]],
+                    on_failed=lambda: spend_ledger.release(reservation)
+                )
+            else:
+                await spend_ledger.release(reservation)
+            raise
+        except BaseException:
+            await spend_ledger.release(reservation)
+            raise
+        if not result.get("success"):
+            await spend_ledger.release(reservation)
         
-        await audit_service.log_action(
-            request.wallet_id,
-            "swap",
-            {
-                "input_mint": request.input_mint,
-                "output_mint": request.output_mint,
-                "amount": request.amount
-            },
-            result
-        )
+        await audit_service.log_action(request.wallet_id, "swap", audit_params, result)
+        
+        if result.get("success") and result["confirmation_status"] in UNCONFIRMED_STATUSES:
+            confirmation_tracker.track(
+                result["signature"],
+                request.commitment,
+                [wallet["pubkey"]],
+                on_failed=lambda: spend_ledger.release(reservation)
+            )
         
         return result
+    except (HTTPException, RpcError):
+        raise
     except Exception as e:
         logging.error(f"Swap execution error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 app.include_router(api_router)
 
+@app.exception_handler(RpcError)
+async def rpc_error_handler(request, exc: RpcError):
+    headers = {}
+    if exc.retry_after is not None:
+        headers["Retry-After"] = str(math.ceil(exc.retry_after))
+    return JSONResponse(
+        status_code=429 if isinstance(exc, RpcRateLimitedError) else 503,
+        content={"detail": str(exc), "rpc_method": exc.method},
+        headers=headers
+    )
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 logging.basicConfig(
@@ -390,6 +873,43 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def _publish_balance(pubkey: str, lamports: int, slot: int) -> None:
+    event_hub.publish([pubkey], "balance", {"pubkey": pubkey, "balance": lamports / 1_000_000_000, "slot": slot})
+
+def _publish_audit(log_entry: Dict[str, Any]) -> None:
+    event_hub.publish([log_entry["wallet_id"]], "audit", log_entry)
+
+def _publish_confirmation(entry: Dict[str, Any]) -> None:
+    event_hub.publish(entry["pubkeys"], "confirmation", entry)
+
+audit_service.add_listener(_publish_audit)
+confirmation_tracker.add_listener(_publish_confirmation)
+if account_mirror:
+    account_mirror.add_listener(_publish_balance)
+
+@app.on_event("startup")
+async def start_background_services():
+    await index_manager.ensure_indexes()
+    if os.environ.get('MONGO_CHECK_QUERY_PLANS', 'false').lower() == 'true':
+        await index_manager.check_query_plans()
+    solana_service.start()
+    swap_service.start()
+    audit_service.start()
+    auth_service.start()
+    agent_service.start()
+    confirmation_tracker.start()
+    if account_mirror:
+        account_mirror.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    if account_mirror:
+        await account_mirror.stop()
+    await confirmation_tracker.stop()
+    await agent_service.close()
+    await audit_service.close()
+    await auth_service.close()
+    await solana_service.close()
+    await swap_service.close()
+    crypto_executor.close()
     client.close()
\ No newline at end of file
@@ -0,0 +1,324 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, Set, Iterable, Tuple, Callable
+from solana.rpc.commitment import Confirmed
+from solana.rpc.types import DataSliceOpts
+from solana.rpc.websocket_api import connect
+from solders.pubkey import Pubkey
+from solders.account_decoder import UiAccountEncoding
+from solders.commitment_config import CommitmentLevel
+from solders.rpc.config import RpcAccountInfoConfig
+from solders.rpc.requests import AccountSubscribe
+from solders.rpc.responses import AccountNotification, SubscriptionResult, SubscriptionError
+
+logger = logging.getLogger(__name__)
+
+# getMultipleAccounts accepts at most 100 pubkeys per request
+SNAPSHOT_CHUNK_SIZE = 100
+# Subscribe requests sent per websocket frame
+SUBSCRIBE_BATCH_SIZE = 100
+
+
+def _ws_url(rpc_url: str) -> str:
+    if rpc_url.startswith("https://"):
+        return "wss://" + rpc_url[len("https://"):]
+    if rpc_url.startswith("http://"):
+        return "ws://" + rpc_url[len("http://"):]
+    return rpc_url
+
+
+class _MirrorConnection:
+    """One websocket carrying up to ``capacity`` account subscriptions; reconnects forever"""
+
+    def __init__(self, mirror: "AccountMirror", index: int, capacity: int):
+        self.mirror = mirror
+        self.index = index
+        self.capacity = capacity
+        self.pubkeys: Set[str] = set()
+        self._requests: Dict[int, str] = {}
+        self._subscriptions: Dict[int, str] = {}
+        self._websocket = None
+        self._task: Optional[asyncio.Task] = None
+        self.reconnects = 0
+
+    @property
+    def connected(self) -> bool:
+        return self._websocket is not None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def add(self, pubkeys: List[str]) -> None:
+        self.pubkeys.update(pubkeys)
+        if self._websocket is not None:
+            await self._subscribe(pubkeys)
+
+    async def _subscribe(self, pubkeys: List[str]) -> None:
+        config = RpcAccountInfoConfig(
+            encoding=UiAccountEncoding.Base64,
+            commitment=CommitmentLevel.Confirmed
+        )
+        for i in range(0, len(pubkeys), SUBSCRIBE_BATCH_SIZE):
+            requests = []
+            for pubkey_str in pubkeys[i:i + SUBSCRIBE_BATCH_SIZE]:
+                request_id = self.mirror._next_request_id()
+                self._requests[request_id] = pubkey_str
+                requests.append(AccountSubscribe(Pubkey.from_string(pubkey_str), config, request_id))
+            await self._websocket.send_data(requests)
+
+    async def _run(self) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                async with connect(self.mirror.ws_url) as websocket:
+                    self._websocket = websocket
+                    backoff = 1.0
+                    await self._subscribe(sorted(self.pubkeys))
+                    async for messages in websocket:
+                        self._handle(messages)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Account mirror connection {self.index} dropped: {e}")
+            finally:
+                self._websocket = None
+                self.mirror._deactivate(self.pubkeys)
+                self._requests.clear()
+                self._subscriptions.clear()
+            self.reconnects += 1
+            await asyncio.sleep(backoff + random.uniform(0, backoff))
+            backoff = min(backoff * 2, 30.0)
+
+    def _handle(self, messages) -> None:
+        subscribed = []
+        for message in messages:
+            if isinstance(message, AccountNotification):
+                pubkey_str = self._subscriptions.get(message.subscription)
+                if pubkey_str is not None:
+                    self.mirror._apply(
+                        pubkey_str,
+                        message.result.value.lamports,
+                        message.result.context.slot,
+                        notified=True
+                    )
+            elif isinstance(message, SubscriptionResult):
+                pubkey_str = self._requests.pop(message.id, None)
+                if pubkey_str is not None:
+                    self._subscriptions[message.result] = pubkey_str
+                    subscribed.append(pubkey_str)
+            elif isinstance(message, SubscriptionError):
+                pubkey_str = self._requests.pop(message.id, None)
+                logger.warning(f"Account subscription for {pubkey_str} rejected: {message.error}")
+        if subscribed:
+            # Seed current balances only once updates are flowing, so none are missed
+            self.mirror._live.update(subscribed)
+            self.mirror._schedule_snapshot(subscribed)
+
+
+class AccountMirror:
+    """In-memory lamport balances for managed wallets, kept current by accountSubscribe.
+
+    Every pubkey in the ``wallets`` collection is subscribed over websockets,
+    ``subscriptions_per_connection`` per connection, and seeded with one
+    getMultipleAccounts snapshot once its subscription is confirmed. Entries
+    are served only while their subscription is live; connections that drop
+    reconnect with backoff and resubscribe everything they carried.
+    """
+
+    def __init__(
+        self,
+        db,
+        solana_service,
+        ws_url: Optional[str] = None,
+        subscriptions_per_connection: int = 1000,
+        rescan_interval: float = 30.0,
+        stale_grace: float = 2.0
+    ):
+        self.wallets_collection = db.wallets
+        self.solana_service = solana_service
+        self.ws_url = ws_url or _ws_url(solana_service.rpc_url)
+        self.subscriptions_per_connection = subscriptions_per_connection
+        self.rescan_interval = rescan_interval
+        self.stale_grace = stale_grace
+        self._connections: List[_MirrorConnection] = []
+        self._entries: Dict[str, Tuple[int, int]] = {}
+        # Subscribed on a connected websocket / additionally seeded since then
+        self._live: Set[str] = set()
+        self._active: Set[str] = set()
+        self._stale_until: Dict[str, float] = {}
+        self._request_id = 0
+        self._snapshot_tasks: Set[asyncio.Task] = set()
+        self._watch_lock = asyncio.Lock()
+        self._listeners: List[Callable[[str, int, int], None]] = []
+        self._task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.notifications = 0
+
+    def add_listener(self, callback: Callable[[str, int, int], None]) -> None:
+        """Call ``callback(pubkey, lamports, slot)`` whenever a notification changes a balance"""
+        self._listeners.append(callback)
+
+    def _next_request_id(self) -> int:
+        self._request_id += 1
+        return self._request_id
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._rescan_loop())
+        for connection in self._connections:
+            connection.start()
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for task in list(self._snapshot_tasks):
+            task.cancel()
+        await asyncio.gather(*(connection.stop() for connection in self._connections))
+
+    async def watch(self, pubkey_strs: Iterable[str]) -> None:
+        """Start mirroring ``pubkey_strs``; already-watched pubkeys are ignored"""
+        async with self._watch_lock:
+            watched = set().union(*(connection.pubkeys for connection in self._connections))
+            new = []
+            for pubkey_str in dict.fromkeys(pubkey_strs):
+                if pubkey_str in watched:
+                    continue
+                try:
+                    Pubkey.from_string(pubkey_str)
+                except ValueError:
+                    logger.error(f"Account mirror skipping invalid pubkey {pubkey_str}")
+                    continue
+                new.append(pubkey_str)
+
+            while new:
+                connection = next(
+                    (c for c in self._connections if len(c.pubkeys) < c.capacity),
+                    None
+                )
+                if connection is None:
+                    connection = _MirrorConnection(
+                        self, len(self._connections), self.subscriptions_per_connection
+                    )
+                    self._connections.append(connection)
+                    if self._task is not None:
+                        connection.start()
+                room = connection.capacity - len(connection.pubkeys)
+                await connection.add(new[:room])
+                new = new[room:]
+
+    async def _rescan_loop(self) -> None:
+        while True:
+            try:
+                cursor = self.wallets_collection.find({}, {"_id": 0, "pubkey": 1}).batch_size(1000)
+                await self.watch([wallet["pubkey"] async for wallet in cursor])
+            except Exception as e:
+                logger.error(f"Account mirror rescan failed: {e}")
+            await asyncio.sleep(self.rescan_interval)
+
+    def _schedule_snapshot(self, pubkey_strs: List[str]) -> None:
+        task = asyncio.create_task(self._snapshot(pubkey_strs))
+        self._snapshot_tasks.add(task)
+        task.add_done_callback(self._snapshot_tasks.discard)
+
+    async def _snapshot(self, pubkey_strs: List[str]) -> None:
+        for i in range(0, len(pubkey_strs), SNAPSHOT_CHUNK_SIZE):
+            chunk = pubkey_strs[i:i + SNAPSHOT_CHUNK_SIZE]
+            try:
+                response = await self.solana_service.client.get_multiple_accounts(
+                    [Pubkey.from_string(pubkey_str) for pubkey_str in chunk],
+                    commitment=Confirmed,
+                    data_slice=DataSliceOpts(offset=0, length=0)
+                )
+            except Exception as e:
+                logger.error(f"Account mirror snapshot failed: {e}")
+                continue
+            slot = response.context.slot
+            for pubkey_str, account in zip(chunk, response.value):
+                self._apply(pubkey_str, account.lamports if account is not None else 0, slot)
+                if pubkey_str in self._live:
+                    self._active.add(pubkey_str)
+
+    def _apply(self, pubkey_str: str, lamports: int, slot: int, notified: bool = False) -> None:
+        current = self._entries.get(pubkey_str)
+        if current is not None and current[1] > slot:
+            return
+        self._entries[pubkey_str] = (lamports, slot)
+        if notified:
+            self.notifications += 1
+            self._stale_until.pop(pubkey_str, None)
+            if current is None or current[0] != lamports:
+                for callback in self._listeners:
+                    try:
+                        callback(pubkey_str, lamports, slot)
+                    except Exception as e:
+                        logger.error(f"Account mirror listener raised: {e}")
+
+    def _deactivate(self, pubkey_strs: Iterable[str]) -> None:
+        pubkey_strs = set(pubkey_strs)
+        self._live.difference_update(pubkey_strs)
+        self._active.difference_update(pubkey_strs)
+
+    def mark_stale(self, *pubkey_strs: str) -> None:
+        """Skip the mirror for ``pubkey_strs`` until their next notification or ``stale_grace``"""
+        until = time.monotonic() + self.stale_grace
+        for pubkey_str in pubkey_strs:
+            if pubkey_str in self._entries:
+                self._stale_until[pubkey_str] = until
+
+    def get_lamports(self, pubkey_str: str) -> Optional[int]:
+        """Mirrored confirmed balance, or None if the entry cannot be trusted right now"""
+        entry = self._entries.get(pubkey_str)
+        stale_until = self._stale_until.get(pubkey_str)
+        if stale_until is not None and time.monotonic() >= stale_until:
+            del self._stale_until[pubkey_str]
+            stale_until = None
+        if entry is None or pubkey_str not in self._active or stale_until is not None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connections": len(self._connections),
+            "connected": sum(1 for connection in self._connections if connection.connected),
+            "reconnects": sum(connection.reconnects for connection in self._connections),
+            "watched": sum(len(connection.pubkeys) for connection in self._connections),
+            "active": len(self._active),
+            "notifications": self.notifications,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+    @classmethod
+    def from_env(cls, db, solana_service) -> Optional["AccountMirror"]:
+        """Build a mirror if ACCOUNT_MIRROR is enabled"""
+        if os.environ.get('ACCOUNT_MIRROR', 'false').lower() != 'true':
+            return None
+        return cls(
+            db,
+            solana_service,
+            ws_url=os.environ.get('SOLANA_WS_URL'),
+            subscriptions_per_connection=int(os.environ.get('ACCOUNT_MIRROR_SUBS_PER_CONNECTION', 1000)),
+            rescan_interval=float(os.environ.get('ACCOUNT_MIRROR_RESCAN_INTERVAL', 30)),
+            stale_grace=float(os.environ.get('ACCOUNT_MIRROR_STALE_GRACE', 2))
+        )
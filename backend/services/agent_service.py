@@ -1,22 +1,99 @@
 import os
+import json
 import uuid
+import asyncio
+import hashlib
 import logging
 from datetime import datetime, timezone
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple, AsyncIterator
 from emergentintegrations.llm.chat import LlmChat, UserMessage
+from pymongo import IndexModel, ASCENDING, DESCENDING
 from dotenv import load_dotenv
 
+from services.batch_writer import BatchWriter
+from services.policy_engine import CompiledPolicy
+from services.cache import TTLCache
+from services.pagination import fetch_page, build_projection, prefix_regex
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+LLM_SYSTEM_MESSAGE = """You are an AI agent managing a Solana wallet. 
+                Analyze the requested action and decide whether to approve it based on:
+                1. Transaction safety
+                2. Amount reasonableness
+                3. Policy compliance
+                
+                Respond in JSON format:
+                {
+                    "approved": true/false,
+                    "reason": "explanation",
+                    "risk_level": "low/medium/high"
+                }"""
+
+AGENT_SORT = [("created_at", DESCENDING), ("_id", DESCENDING)]
+AGENT_FIELDS = ("agent_id", "name", "agent_type", "wallet_id", "policy", "status", "created_at")
+
+
+class LlmUnavailableError(Exception):
+    """The LLM could not produce a decision in time or had no free capacity"""
+
+
 class AgentService:
+    INDEXES = {
+        "agents": [
+            IndexModel([("agent_id", ASCENDING)], unique=True),
+            IndexModel([("wallet_id", ASCENDING)]),
+            IndexModel(AGENT_SORT),
+            IndexModel([("wallet_id", ASCENDING)] + AGENT_SORT),
+            IndexModel([("status", ASCENDING)] + AGENT_SORT),
+            IndexModel([("agent_type", ASCENDING)] + AGENT_SORT),
+            IndexModel([("name", ASCENDING)] + AGENT_SORT),
+        ],
+        "agent_logs": [
+            IndexModel([("agent_id", ASCENDING), ("timestamp", DESCENDING)]),
+        ],
+    }
+    HOT_QUERIES = [
+        ("agents", {"agent_id": ""}, None),
+        ("agents", {}, AGENT_SORT),
+        ("agents", {"wallet_id": ""}, AGENT_SORT),
+        ("agents", {"status": ""}, AGENT_SORT),
+        ("agents", {"agent_type": ""}, AGENT_SORT),
+        ("agents", {"name": ""}, AGENT_SORT),
+        ("agent_logs", {"agent_id": ""}, [("timestamp", DESCENDING)]),
+    ]
+    
     def __init__(self, db, wallet_service):
         self.db = db
         self.wallet_service = wallet_service
         self.agents_collection = db.agents
         self.agent_logs_collection = db.agent_logs
         self.llm_key = os.environ.get('EMERGENT_LLM_KEY')
+        self.batch_concurrency = int(os.environ.get('AGENT_BATCH_CONCURRENCY', 32))
+        self.log_writer: Optional[BatchWriter] = None
+        self._compiled_policies: Dict[str, CompiledPolicy] = {}
+        self.decision_cache = TTLCache(
+            ttl=float(os.environ.get('LLM_DECISION_CACHE_TTL', 60)),
+            max_size=int(os.environ.get('LLM_DECISION_CACHE_MAX_SIZE', 1000))
+        )
+        self.llm_deadline = float(os.environ.get('LLM_DECISION_DEADLINE', 10))
+        self.llm_slots = asyncio.Semaphore(int(os.environ.get('LLM_MAX_CONCURRENCY', 16)))
+        self.llm_slots_per_agent = int(os.environ.get('LLM_MAX_CONCURRENCY_PER_AGENT', 2))
+        # In-flight LLM calls per agent; entries are removed when they reach zero
+        self._agent_llm_calls: Dict[str, int] = {}
+    
+    def start(self) -> None:
+        """Enable write-behind decision logs if configured; call from the running event loop"""
+        self.log_writer = BatchWriter.from_env(self.agent_logs_collection)
+        if self.log_writer:
+            self.log_writer.start()
+    
+    async def close(self) -> None:
+        if self.log_writer:
+            await self.log_writer.stop()
+            self.log_writer = None
     
     async def create_agent(
         self,
@@ -35,6 +112,11 @@ class AgentService:
             "auto_approve_below": 0.1,
             "require_simulation": True
         }
+        if policy:
+            try:
+                CompiledPolicy(policy)
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"Invalid policy: {e}")
         
         agent_doc = {
             "agent_id": agent_id,
@@ -58,11 +140,68 @@ class AgentService:
         }
     
     async def get_all_agents(self) -> List[Dict[str, Any]]:
-        agents = await self.agents_collection.find(
-            {},
-            {"_id": 0}
-        ).to_list(1000)
-        return agents
+        return [agent async for agent in self.stream_agents()]
+    
+    def _build_query(
+        self,
+        name_prefix: Optional[str] = None,
+        agent_type: Optional[str] = None,
+        status: Optional[str] = None,
+        wallet_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        query: Dict[str, Any] = {}
+        if name_prefix:
+            query["name"] = prefix_regex(name_prefix)
+        if agent_type:
+            query["agent_type"] = agent_type
+        if status:
+            query["status"] = status
+        if wallet_id:
+            query["wallet_id"] = wallet_id
+        return query
+    
+    async def get_agents_page(
+        self,
+        name_prefix: Optional[str] = None,
+        agent_type: Optional[str] = None,
+        status: Optional[str] = None,
+        wallet_id: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Return one page of agents, newest first, and a cursor for the next page"""
+        projection, extra = build_projection(fields, AGENT_FIELDS, AGENT_SORT)
+        agents, next_cursor = await fetch_page(
+            self.agents_collection,
+            self._build_query(name_prefix, agent_type, status, wallet_id),
+            AGENT_SORT,
+            limit,
+            cursor,
+            projection
+        )
+        for agent in agents:
+            for field in extra:
+                agent.pop(field, None)
+        return {"agents": agents, "next_cursor": next_cursor}
+    
+    async def stream_agents(
+        self,
+        name_prefix: Optional[str] = None,
+        agent_type: Optional[str] = None,
+        status: Optional[str] = None,
+        wallet_id: Optional[str] = None,
+        fields: Optional[List[str]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield matching agents straight from the Motor cursor, newest first"""
+        projection, _ = build_projection(fields, AGENT_FIELDS, [])
+        projection["_id"] = 0
+        cursor = self.agents_collection.find(
+            self._build_query(name_prefix, agent_type, status, wallet_id),
+            projection
+        ).sort(AGENT_SORT).batch_size(1000)
+        async for agent in cursor:
+            yield agent
     
     async def execute_action(
         self,
@@ -78,8 +217,68 @@ class AgentService:
         if not agent:
             raise ValueError(f"Agent {agent_id} not found")
         
+        result, decision_log = await self._decide(agent, action_type, params)
+        
+        if self.log_writer:
+            await self.log_writer.write(decision_log)
+        else:
+            await self.agent_logs_collection.insert_one(decision_log)
+        
+        return result
+    
+    async def execute_batch(
+        self,
+        actions: List[Tuple[str, str, Dict[str, Any]]],
+        max_concurrency: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Run many (agent_id, action_type, params) decisions with one agent
+        lookup and one log write; results keep input order with per-item errors."""
+        agent_ids = list({agent_id for agent_id, _, _ in actions})
+        agents = {
+            agent["agent_id"]: agent
+            async for agent in self.agents_collection.find(
+                {"agent_id": {"$in": agent_ids}},
+                {"_id": 0}
+            )
+        }
+        
+        semaphore = asyncio.Semaphore(max_concurrency or self.batch_concurrency)
+        
+        async def run(index: int, agent_id: str, action_type: str, params: Dict[str, Any]):
+            agent = agents.get(agent_id)
+            if not agent:
+                return {"index": index, "agent_id": agent_id, "error": f"Agent {agent_id} not found"}, None
+            try:
+                async with semaphore:
+                    result, decision_log = await self._decide(agent, action_type, params)
+                return {"index": index, "agent_id": agent_id, "result": result}, decision_log
+            except Exception as e:
+                logger.error(f"Batch decision error for agent {agent_id}: {e}")
+                return {"index": index, "agent_id": agent_id, "error": str(e)}, None
+        
+        outcomes = await asyncio.gather(*(
+            run(index, agent_id, action_type, params)
+            for index, (agent_id, action_type, params) in enumerate(actions)
+        ))
+        
+        decision_logs = [decision_log for _, decision_log in outcomes if decision_log]
+        if decision_logs:
+            if self.log_writer:
+                for decision_log in decision_logs:
+                    await self.log_writer.write(decision_log)
+            else:
+                await self.agent_logs_collection.insert_many(decision_logs, ordered=False)
+        
+        return [item for item, _ in outcomes]
+    
+    async def _decide(
+        self,
+        agent: Dict[str, Any],
+        action_type: str,
+        params: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         decision_log = {
-            "agent_id": agent_id,
+            "agent_id": agent["agent_id"],
             "action_type": action_type,
             "params": params,
             "timestamp": datetime.now(timezone.utc).isoformat()
@@ -91,9 +290,35 @@ class AgentService:
             result = await self._execute_llm_driven(agent, action_type, params)
         
         decision_log["result"] = result
-        await self.agent_logs_collection.insert_one(decision_log)
+        if result.get("cached"):
+            decision_log["cached"] = True
+        if result.get("fallback"):
+            decision_log["fallback"] = result["fallback"]
+        return result, decision_log
+    
+    def _get_compiled_policy(self, agent: Dict[str, Any]) -> CompiledPolicy:
+        """Return the agent's cached evaluator, rebuilding it if the policy changed"""
+        compiled = self._compiled_policies.get(agent["agent_id"])
+        if compiled is None or not compiled.matches(agent["policy"]):
+            compiled = CompiledPolicy(agent["policy"])
+            self._compiled_policies[agent["agent_id"]] = compiled
+        return compiled
+    
+    async def evaluate_policy_batch(
+        self,
+        agent_id: str,
+        actions: List[Tuple[str, Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """Dry-run many candidate actions against an agent's policy in one pass"""
+        agent = await self.agents_collection.find_one(
+            {"agent_id": agent_id},
+            {"_id": 0}
+        )
         
-        return result
+        if not agent:
+            raise ValueError(f"Agent {agent_id} not found")
+        
+        return self._get_compiled_policy(agent).evaluate_batch(actions)
     
     async def _execute_rule_based(
         self,
@@ -101,71 +326,95 @@ class AgentService:
         action_type: str,
         params: Dict[str, Any]
     ) -> Dict[str, Any]:
-        policy = agent["policy"]
+        return self._get_compiled_policy(agent).evaluate(action_type, params)
+    
+    def _new_chat(self, agent_id: str) -> LlmChat:
+        """A fresh chat per decision, so no history carries over or interleaves between decisions"""
+        chat = LlmChat(
+            api_key=self.llm_key,
+            session_id=f"agent-{agent_id}-{uuid.uuid4()}",
+            system_message=LLM_SYSTEM_MESSAGE
+        )
+        chat.with_model("openai", "gpt-5.2")
+        return chat
+    
+    @staticmethod
+    def _decision_key(action_type: str, params: Dict[str, Any], policy: Dict[str, Any]) -> str:
+        normalized = json.dumps(
+            {"action_type": action_type, "params": params, "policy": policy},
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str
+        )
+        return hashlib.sha256(normalized.encode()).hexdigest()
+    
+    async def _execute_llm_driven(
+        self,
+        agent: Dict[str, Any],
+        action_type: str,
+        params: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        requested = False
         
-        if action_type == "transfer":
-            amount = params.get("amount", 0)
-            
-            if amount > policy["max_transaction_amount"]:
-                return {
-                    "approved": False,
-                    "reason": f"Amount {amount} exceeds policy limit {policy['max_transaction_amount']}",
-                    "decision_type": "rule-based"
-                }
-            
-            return {
-                "approved": True,
-                "action": "transfer",
-                "params": params,
-                "decision_type": "rule-based",
-                "auto_execute": amount <= policy["auto_approve_below"]
-            }
+        async def request_decision():
+            nonlocal requested
+            requested = True
+            return await self._limited_llm_decision(agent, action_type, params)
         
-        elif action_type == "swap":
-            amount = params.get("amount", 0)
-            
-            if amount > policy["max_transaction_amount"]:
-                return {
-                    "approved": False,
-                    "reason": f"Swap amount {amount} exceeds policy limit",
-                    "decision_type": "rule-based"
-                }
-            
-            return {
-                "approved": True,
-                "action": "swap",
-                "params": params,
-                "decision_type": "rule-based",
-                "auto_execute": amount <= policy["auto_approve_below"]
-            }
+        try:
+            decision = await self.decision_cache.get_or_load(
+                self._decision_key(action_type, params, agent["policy"]),
+                request_decision,
+                # Errors are not cached so the next call retries the LLM
+                ttl=lambda result: 0 if result.get("error") else None
+            )
+        except LlmUnavailableError as e:
+            logger.warning(f"LLM unavailable for agent {agent['agent_id']}, using rules: {e}")
+            decision = await self._execute_rule_based(agent, action_type, params)
+            decision["fallback"] = {"from": "llm-driven", "reason": str(e)}
+            return decision
         
-        return {"approved": True, "decision_type": "rule-based"}
+        decision = dict(decision)
+        decision["cached"] = not requested
+        return decision
     
-    async def _execute_llm_driven(
+    async def _limited_llm_decision(
         self,
         agent: Dict[str, Any],
         action_type: str,
         params: Dict[str, Any]
     ) -> Dict[str, Any]:
+        """Call the LLM under the global and per-agent limits and the decision deadline"""
+        agent_id = agent["agent_id"]
+        if self.llm_slots.locked():
+            raise LlmUnavailableError("global LLM concurrency limit reached")
+        if self._agent_llm_calls.get(agent_id, 0) >= self.llm_slots_per_agent:
+            raise LlmUnavailableError("per-agent LLM concurrency limit reached")
+        
+        self._agent_llm_calls[agent_id] = self._agent_llm_calls.get(agent_id, 0) + 1
         try:
-            chat = LlmChat(
-                api_key=self.llm_key,
-                session_id=f"agent-{agent['agent_id']}",
-                system_message="""You are an AI agent managing a Solana wallet. 
-                Analyze the requested action and decide whether to approve it based on:
-                1. Transaction safety
-                2. Amount reasonableness
-                3. Policy compliance
-                
-                Respond in JSON format:
-                {
-                    "approved": true/false,
-                    "reason": "explanation",
-                    "risk_level": "low/medium/high"
-                }"""
-            )
-            
-            chat.with_model("openai", "gpt-5.2")
+            async with self.llm_slots:
+                return await asyncio.wait_for(
+                    self._request_llm_decision(agent, action_type, params),
+                    self.llm_deadline
+                )
+        except asyncio.TimeoutError:
+            raise LlmUnavailableError(f"LLM decision exceeded {self.llm_deadline:g}s deadline")
+        finally:
+            remaining = self._agent_llm_calls[agent_id] - 1
+            if remaining:
+                self._agent_llm_calls[agent_id] = remaining
+            else:
+                del self._agent_llm_calls[agent_id]
+    
+    async def _request_llm_decision(
+        self,
+        agent: Dict[str, Any],
+        action_type: str,
+        params: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        try:
+            chat = self._new_chat(agent["agent_id"])
             
             prompt = f"""Action Type: {action_type}
 Parameters: {params}
@@ -176,14 +425,14 @@ Should this action be approved?"""
             message = UserMessage(text=prompt)
             response = await chat.send_message(message)
             
-            import json
             try:
                 decision = json.loads(response)
             except:
                 decision = {
                     "approved": False,
                     "reason": "Failed to parse LLM response",
-                    "risk_level": "high"
+                    "risk_level": "high",
+                    "error": True
                 }
             
             decision["decision_type"] = "llm-driven"
@@ -197,4 +446,4 @@ Should this action be approved?"""
                 "reason": f"LLM error: {str(e)}",
                 "decision_type": "llm-driven",
                 "error": True
-            }
\ No newline at end of file
+            }
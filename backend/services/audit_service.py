@@ -1,13 +1,58 @@
 from datetime import datetime, timezone
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, AsyncIterator, Callable
+from pymongo import IndexModel, ASCENDING, DESCENDING
 import logging
 
+from services.batch_writer import BatchWriter
+from services.pagination import fetch_page
+
 logger = logging.getLogger(__name__)
 
+# Keyset order for paging and exports; _id breaks timestamp ties
+LOG_SORT = [("timestamp", DESCENDING), ("_id", DESCENDING)]
+
+def _to_utc_iso(value: datetime) -> str:
+    # Naive datetimes are taken to be UTC, matching the stored timestamps
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat()
+
 class AuditService:
+    INDEXES = {
+        "audit_logs": [
+            IndexModel([("wallet_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]),
+            IndexModel([("timestamp", DESCENDING), ("_id", DESCENDING)]),
+            IndexModel([("result.signature", ASCENDING)], sparse=True),
+            IndexModel([("result.transactions.signature", ASCENDING)], sparse=True),
+        ],
+    }
+    HOT_QUERIES = [
+        ("audit_logs", {"wallet_id": ""}, LOG_SORT),
+        ("audit_logs", {}, LOG_SORT),
+        ("audit_logs", {"result.signature": ""}, None),
+        ("audit_logs", {"result.transactions.signature": ""}, None),
+    ]
+    
     def __init__(self, db):
         self.db = db
         self.audit_collection = db.audit_logs
+        self.writer: Optional[BatchWriter] = None
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+    
+    def add_listener(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """Call ``callback(log_entry)`` for every new audit entry"""
+        self._listeners.append(callback)
+    
+    def start(self) -> None:
+        """Enable write-behind logging if configured; call from the running event loop"""
+        self.writer = BatchWriter.from_env(self.audit_collection)
+        if self.writer:
+            self.writer.start()
+    
+    async def close(self) -> None:
+        if self.writer:
+            await self.writer.stop()
+            self.writer = None
     
     async def log_action(
         self,
@@ -24,15 +69,71 @@ class AuditService:
             "timestamp": datetime.now(timezone.utc).isoformat(),
             "success": result.get("success", False)
         }
+        if result.get("confirmation_status"):
+            log_entry["confirmation_status"] = result["confirmation_status"]
         
-        await self.audit_collection.insert_one(log_entry)
+        if self.writer:
+            await self.writer.write(log_entry)
+        else:
+            await self.audit_collection.insert_one(log_entry)
         logger.info(f"Audit log created: {action_type} for wallet {wallet_id}")
+        
+        for callback in self._listeners:
+            try:
+                callback({k: v for k, v in log_entry.items() if k != "_id"})
+            except Exception as e:
+                logger.error(f"Audit listener raised: {e}")
+    
+    async def update_confirmation(
+        self,
+        signature: str,
+        status: str,
+        error: Optional[str] = None
+    ) -> None:
+        update_fields = {
+            "confirmation_status": status,
+            "confirmed_at": datetime.now(timezone.utc).isoformat()
+        }
+        if error:
+            update_fields["success"] = False
+            update_fields["result.error"] = error
+        else:
+            # Sends whose RPC call errored may still have landed
+            update_fields["success"] = True
+            update_fields["result.success"] = True
+        
+        if self.writer:
+            # The entry may still be queued; make sure it exists before updating
+            await self.writer.flush()
+        
+        update_result = await self.audit_collection.update_one(
+            {"result.signature": signature},
+            {"$set": update_fields}
+        )
+        if update_result.matched_count == 0:
+            # Grouped entries (batch payouts) hold one result per transaction
+            transaction_fields = {
+                "result.transactions.$.confirmation_status": status
+            }
+            if error:
+                transaction_fields["result.transactions.$.success"] = False
+                transaction_fields["result.transactions.$.error"] = error
+                transaction_fields["success"] = False
+            else:
+                transaction_fields["result.transactions.$.success"] = True
+            await self.audit_collection.update_one(
+                {"result.transactions.signature": signature},
+                {"$set": transaction_fields}
+            )
+        logger.info(f"Audit log updated: {signature} is {status}")
     
     async def get_logs(
         self,
         wallet_id: Optional[str] = None,
         limit: int = 100
     ) -> List[Dict[str, Any]]:
+        if self.writer:
+            await self.writer.flush()
         query = {"wallet_id": wallet_id} if wallet_id else {}
         
         logs = await self.audit_collection.find(
@@ -40,4 +141,70 @@ class AuditService:
             {"_id": 0}
         ).sort("timestamp", -1).limit(limit).to_list(limit)
         
-        return logs
\ No newline at end of file
+        return logs
+    
+    def _build_query(
+        self,
+        wallet_id: Optional[str] = None,
+        action_type: Optional[str] = None,
+        success: Optional[bool] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        query: Dict[str, Any] = {}
+        if wallet_id:
+            query["wallet_id"] = wallet_id
+        if action_type:
+            query["action_type"] = action_type
+        if success is not None:
+            query["success"] = success
+        # Timestamps are stored as UTC ISO-8601 strings, which sort chronologically
+        if since or until:
+            query["timestamp"] = {}
+            if since:
+                query["timestamp"]["$gte"] = _to_utc_iso(since)
+            if until:
+                query["timestamp"]["$lt"] = _to_utc_iso(until)
+        return query
+    
+    async def get_logs_page(
+        self,
+        wallet_id: Optional[str] = None,
+        action_type: Optional[str] = None,
+        success: Optional[bool] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Return one page of logs, newest first, and a cursor for the next page"""
+        if self.writer:
+            await self.writer.flush()
+        query = self._build_query(wallet_id, action_type, success, since, until)
+        
+        logs, next_cursor = await fetch_page(
+            self.audit_collection,
+            query,
+            LOG_SORT,
+            limit,
+            cursor
+        )
+        
+        return {"logs": logs, "next_cursor": next_cursor}
+    
+    async def stream_logs(
+        self,
+        wallet_id: Optional[str] = None,
+        action_type: Optional[str] = None,
+        success: Optional[bool] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield matching logs straight from the Motor cursor, newest first"""
+        if self.writer:
+            await self.writer.flush()
+        query = self._build_query(wallet_id, action_type, success, since, until)
+        
+        cursor = self.audit_collection.find(query, {"_id": 0}).sort(LOG_SORT).batch_size(1000)
+        async for log in cursor:
+            yield log
@@ -1,21 +1,70 @@
 import os
 import uuid
-import bcrypt
+import asyncio
+import hashlib
 import jwt
 from datetime import datetime, timezone, timedelta
 from typing import Dict, Any, Optional
+from pymongo import IndexModel, ASCENDING, UpdateOne
 import secrets
 import logging
 
+from services.cache import TTLCache
+from services.crypto_executor import CryptoExecutor
+
 logger = logging.getLogger(__name__)
 
 class AuthService:
-    def __init__(self, db):
+    INDEXES = {
+        "users": [
+            IndexModel([("user_id", ASCENDING)], unique=True),
+            IndexModel([("username", ASCENDING)], unique=True),
+            IndexModel([("email", ASCENDING)], unique=True),
+        ],
+        "api_keys": [
+            IndexModel([("api_key", ASCENDING)], unique=True),
+            IndexModel([("key_id", ASCENDING)], unique=True),
+            IndexModel([("user_id", ASCENDING)]),
+        ],
+    }
+    HOT_QUERIES = [
+        ("users", {"username": ""}, None),
+        ("api_keys", {"api_key": "", "is_active": True}, None),
+    ]
+    
+    def __init__(self, db, crypto_executor: Optional[CryptoExecutor] = None):
         self.db = db
+        self.crypto = crypto_executor or CryptoExecutor.from_env()
         self.users_collection = db.users
         self.api_keys_collection = db.api_keys
         self.secret_key = os.environ.get('JWT_SECRET_KEY', 'dev-secret-key-change-in-prod')
         self.token_expiry_hours = 24
+        # Verified keys by SHA-256 of the key; revocation in another process
+        # takes effect here within API_KEY_CACHE_TTL seconds
+        self.api_key_cache = TTLCache(
+            ttl=float(os.environ.get('API_KEY_CACHE_TTL', 30)),
+            max_size=int(os.environ.get('API_KEY_CACHE_MAX_SIZE', 10000))
+        )
+        self.last_used_flush_interval = float(os.environ.get('API_KEY_LAST_USED_FLUSH_INTERVAL', 10))
+        # Latest use per key_id, written in one bulk_write per flush
+        self._pending_last_used: Dict[str, str] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self.last_used_flushes = 0
+    
+    def start(self) -> None:
+        """Begin flushing last_used in the background; call from the running event loop"""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+    
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush_last_used()
     
     async def register_user(
         self,
@@ -31,14 +80,14 @@ class AuthService:
         if existing:
             raise ValueError("Username or email already exists")
         
-        password_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt())
+        password_hash = await self.crypto.hash_password(password)
         
         user_id = str(uuid.uuid4())
         user_doc = {
             "user_id": user_id,
             "username": username,
             "email": email,
-            "password_hash": password_hash.decode(),
+            "password_hash": password_hash,
             "created_at": datetime.now(timezone.utc).isoformat(),
             "is_active": True
         }
@@ -67,7 +116,7 @@ class AuthService:
         if not user:
             raise ValueError("Invalid credentials")
         
-        if not bcrypt.checkpw(password.encode(), user["password_hash"].encode()):
+        if not await self.crypto.check_password(password, user["password_hash"]):
             raise ValueError("Invalid credentials")
         
         if not user.get("is_active", True):
@@ -130,22 +179,65 @@ class AuthService:
             "permissions": key_doc["permissions"]
         }
     
+    @staticmethod
+    def _api_key_hash(api_key: str) -> str:
+        return hashlib.sha256(api_key.encode()).hexdigest()
+    
     async def verify_api_key(self, api_key: str) -> Dict[str, Any]:
-        key_doc = await self.api_keys_collection.find_one(
-            {"api_key": api_key, "is_active": True},
-            {"_id": 0}
+        key_doc = await self.api_key_cache.get_or_load(
+            self._api_key_hash(api_key),
+            lambda: self.api_keys_collection.find_one(
+                {"api_key": api_key, "is_active": True},
+                {"_id": 0}
+            ),
+            # Only verified keys are cached, so new keys work immediately
+            ttl=lambda doc: None if doc else 0
         )
         
         if not key_doc:
             raise ValueError("Invalid API key")
         
-        await self.api_keys_collection.update_one(
-            {"api_key": api_key},
-            {"$set": {"last_used": datetime.now(timezone.utc).isoformat()}}
-        )
+        last_used = datetime.now(timezone.utc).isoformat()
+        if self._flush_task is not None:
+            self._pending_last_used[key_doc["key_id"]] = last_used
+        else:
+            await self.api_keys_collection.update_one(
+                {"key_id": key_doc["key_id"]},
+                {"$set": {"last_used": last_used}}
+            )
         
         return key_doc
     
+    async def flush_last_used(self) -> None:
+        if not self._pending_last_used:
+            return
+        pending, self._pending_last_used = self._pending_last_used, {}
+        # $max keeps the newest timestamp when several processes flush the same key
+        operations = [
+            UpdateOne({"key_id": key_id}, {"$max": {"last_used": last_used}})
+            for key_id, last_used in pending.items()
+        ]
+        try:
+            await self.api_keys_collection.bulk_write(operations, ordered=False)
+            self.last_used_flushes += 1
+        except Exception as e:
+            logger.error(f"Flushing last_used for {len(pending)} API keys failed: {e}")
+            for key_id, last_used in pending.items():
+                if last_used > self._pending_last_used.get(key_id, ""):
+                    self._pending_last_used[key_id] = last_used
+    
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.last_used_flush_interval)
+            await self.flush_last_used()
+    
+    def api_key_stats(self) -> Dict[str, Any]:
+        return {
+            **self.api_key_cache.stats(),
+            "pending_last_used": len(self._pending_last_used),
+            "last_used_flushes": self.last_used_flushes
+        }
+    
     async def list_api_keys(self, user_id: str) -> list:
         keys = await self.api_keys_collection.find(
             {"user_id": user_id},
@@ -155,9 +247,13 @@ class AuthService:
         return keys
     
     async def revoke_api_key(self, key_id: str, user_id: str) -> bool:
-        result = await self.api_keys_collection.update_one(
-            {"key_id": key_id, "user_id": user_id},
-            {"$set": {"is_active": False}}
+        key_doc = await self.api_keys_collection.find_one_and_update(
+            {"key_id": key_id, "user_id": user_id, "is_active": True},
+            {"$set": {"is_active": False}},
+            projection={"_id": 0, "api_key": 1}
         )
         
-        return result.modified_count > 0
\ No newline at end of file
+        if not key_doc:
+            return False
+        self.api_key_cache.invalidate(self._api_key_hash(key_doc["api_key"]))
+        return True
\ No newline at end of file
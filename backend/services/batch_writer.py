@@ -0,0 +1,141 @@
+import os
+import json
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+
+class BatchWriter:
+    """Write-behind inserter for append-only collections.
+
+    Documents are queued and flushed with ``insert_many(ordered=False)`` when
+    ``max_batch_size`` documents are waiting or every ``flush_interval``
+    seconds. ``write`` blocks once ``max_queue_size`` documents are pending.
+    Batches that cannot reach Mongo are appended to ``spill_path`` as NDJSON
+    and replayed the next time the writer starts.
+    """
+
+    def __init__(
+        self,
+        collection,
+        max_batch_size: int = 500,
+        flush_interval: float = 0.5,
+        max_queue_size: int = 10000,
+        spill_path: Optional[str] = None
+    ):
+        self.collection = collection
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.spill_path = spill_path
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._batch_ready = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.batches = 0
+        self.spilled = 0
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            # Holding the lock ensures the task is not cancelled mid-insert
+            async with self._flush_lock:
+                self._task.cancel()
+                try:
+                    await self._task
+                except asyncio.CancelledError:
+                    pass
+            self._task = None
+        await self.flush()
+
+    async def write(self, document: Dict[str, Any]) -> None:
+        await self._queue.put(document)
+        if self._queue.qsize() >= self.max_batch_size:
+            self._batch_ready.set()
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            while not self._queue.empty():
+                batch = []
+                while len(batch) < self.max_batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                await self._insert(batch)
+
+    async def _run(self) -> None:
+        async with self._flush_lock:
+            await self._replay_spill()
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            await self.flush()
+
+    async def _insert(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            await self.collection.insert_many(batch, ordered=False)
+            self.written += len(batch)
+            self.batches += 1
+        except BulkWriteError as e:
+            # Rejected documents (e.g. duplicates) would fail again, so only log them
+            errors = e.details.get("writeErrors", [])
+            self.written += len(batch) - len(errors)
+            self.batches += 1
+            logger.error(f"{len(errors)} documents rejected by {self.collection.name}: {errors[:3]}")
+        except Exception as e:
+            logger.error(f"Batch insert into {self.collection.name} failed: {e}")
+            self._spill(batch)
+
+    def _spill(self, batch: List[Dict[str, Any]]) -> None:
+        if not self.spill_path:
+            logger.error(f"Dropping {len(batch)} documents for {self.collection.name}: no spill file")
+            return
+        os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+        with open(self.spill_path, "a") as spill_file:
+            for document in batch:
+                # insert_many assigned an ObjectId client-side; let Mongo assign a new one
+                document = {k: v for k, v in document.items() if k != "_id"}
+                spill_file.write(json.dumps(document, default=str) + "\n")
+        self.spilled += len(batch)
+        logger.warning(f"Spilled {len(batch)} documents for {self.collection.name} to {self.spill_path}")
+
+    async def _replay_spill(self) -> None:
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return
+        replay_path = f"{self.spill_path}.replay"
+        os.replace(self.spill_path, replay_path)
+        with open(replay_path) as spill_file:
+            documents = [json.loads(line) for line in spill_file if line.strip()]
+        for i in range(0, len(documents), self.max_batch_size):
+            await self._insert(documents[i:i + self.max_batch_size])
+        os.remove(replay_path)
+        logger.info(f"Replayed {len(documents)} spilled documents into {self.collection.name}")
+
+    @classmethod
+    def from_env(cls, collection) -> Optional["BatchWriter"]:
+        """Build a writer for ``collection`` if LOG_WRITE_BEHIND is enabled"""
+        if os.environ.get('LOG_WRITE_BEHIND', 'false').lower() != 'true':
+            return None
+        spill_dir = os.environ.get('LOG_SPILL_DIR', '/tmp/agentic-wallet')
+        return cls(
+            collection,
+            max_batch_size=int(os.environ.get('LOG_BATCH_SIZE', 500)),
+            flush_interval=float(os.environ.get('LOG_FLUSH_INTERVAL', 0.5)),
+            max_queue_size=int(os.environ.get('LOG_QUEUE_SIZE', 10000)),
+            spill_path=os.path.join(spill_dir, f"{collection.name}.spill.ndjson")
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "batches": self.batches,
+            "spilled": self.spilled
+        }
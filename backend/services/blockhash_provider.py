@@ -0,0 +1,100 @@
+import time
+import asyncio
+import logging
+from typing import Optional
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.commitment import Commitment, Confirmed
+from solders.hash import Hash
+
+logger = logging.getLogger(__name__)
+
+# A blockhash is accepted for 150 blocks after the block it was taken from
+BLOCKHASH_VALIDITY_BLOCKS = 150
+# Expected block time, used to estimate the current block height between refreshes
+SLOT_TIME_SECONDS = 0.4
+
+
+class BlockhashProvider:
+    """Keeps a recent blockhash warm by refreshing it in the background.
+
+    ``get_blockhash`` returns the cached value without an RPC round trip as
+    long as its ``lastValidBlockHeight`` has not (by estimate) been reached.
+    """
+
+    def __init__(
+        self,
+        client: AsyncClient,
+        refresh_interval: float = 0.4,
+        commitment: Commitment = Confirmed,
+        safety_margin_blocks: int = 30
+    ):
+        self.client = client
+        self.refresh_interval = refresh_interval
+        self.commitment = commitment
+        self.safety_margin_blocks = safety_margin_blocks
+        self._blockhash: Optional[Hash] = None
+        self._last_valid_block_height = 0
+        self._fetched_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._refresh_lock = asyncio.Lock()
+        self.cache_hits = 0
+        self.inline_fetches = 0
+
+    @property
+    def last_valid_block_height(self) -> int:
+        return self._last_valid_block_height
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _is_valid(self) -> bool:
+        if self._blockhash is None:
+            return False
+        elapsed_blocks = int((time.monotonic() - self._fetched_at) / SLOT_TIME_SECONDS)
+        estimated_height = (
+            self._last_valid_block_height - BLOCKHASH_VALIDITY_BLOCKS + elapsed_blocks
+        )
+        return estimated_height + self.safety_margin_blocks < self._last_valid_block_height
+
+    async def _fetch(self) -> Hash:
+        response = await self.client.get_latest_blockhash(commitment=self.commitment)
+        self._blockhash = response.value.blockhash
+        self._last_valid_block_height = response.value.last_valid_block_height
+        self._fetched_at = time.monotonic()
+        return self._blockhash
+
+    async def refresh(self) -> Hash:
+        async with self._refresh_lock:
+            return await self._fetch()
+
+    async def get_blockhash(self) -> Hash:
+        if self._is_valid():
+            self.cache_hits += 1
+            return self._blockhash
+        # Background refresh is not running or has fallen behind
+        async with self._refresh_lock:
+            if self._is_valid():
+                self.cache_hits += 1
+                return self._blockhash
+            self.inline_fetches += 1
+            return await self._fetch()
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Blockhash refresh failed: {e}")
+            await asyncio.sleep(self.refresh_interval)
@@ -0,0 +1,132 @@
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, Union
+
+
+# Handed to coalesced waiters when the caller running the loader is cancelled
+_RETRY = object()
+
+
+class TTLCache:
+    """Bounded LRU cache with per-entry TTL and single-flight loading.
+
+    Concurrent ``get_or_load`` misses for the same key share one loader call.
+    With ``sliding=True`` the TTL is an idle timeout, refreshed on every hit.
+    """
+
+    def __init__(self, ttl: float, max_size: int = 1024, sliding: bool = False):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.sliding = sliding
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, float]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._lookup(key) is not None
+
+    def _lookup(self, key: Hashable) -> Optional[Tuple[float, Any, float]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        now = time.monotonic()
+        if entry[0] <= now:
+            del self._entries[key]
+            return None
+        if self.sliding:
+            entry = (now + entry[2], entry[1], entry[2])
+            self._entries[key] = entry
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._lookup(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0 or self.max_size <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, value, ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+        # Detach any in-flight load so its (possibly stale) result is not stored
+        self._inflight.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._inflight.clear()
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Union[None, float, Callable[[Any], float]] = None
+    ) -> Any:
+        """Return the cached value or load it; ``ttl`` may be derived from the value"""
+        while True:
+            entry = self._lookup(key)
+            if entry is not None:
+                self.hits += 1
+                return entry[1]
+
+            future = self._inflight.get(key)
+            if future is None:
+                break
+            self.coalesced += 1
+            value = await asyncio.shield(future)
+            if value is not _RETRY:
+                return value
+            # The loading caller was cancelled; take over the load instead
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except BaseException as e:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            if not future.done():
+                if isinstance(e, asyncio.CancelledError):
+                    # Only this caller was cancelled; waiters retry the load
+                    future.set_result(_RETRY)
+                else:
+                    future.set_exception(e)
+                    # Mark retrieved so waiter-less failures do not warn
+                    future.exception()
+            raise
+
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+            self.set(key, value, ttl(value) if callable(ttl) else ttl)
+        future.set_result(value)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
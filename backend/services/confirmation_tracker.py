@@ -0,0 +1,205 @@
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, Iterable, Callable, Awaitable, List
+from solders.signature import Signature
+from solders.transaction_status import TransactionConfirmationStatus
+
+from services.cache import TTLCache
+from services.blockhash_provider import BLOCKHASH_VALIDITY_BLOCKS
+
+logger = logging.getLogger(__name__)
+
+COMMITMENT_LEVELS = {"processed": 0, "confirmed": 1, "finalized": 2}
+# Results of sends whose target commitment was not (yet) observed
+UNCONFIRMED_STATUSES = ("submitted", "timeout")
+# getSignatureStatuses accepts at most 256 signatures per request
+MAX_SIGNATURES_PER_REQUEST = 256
+
+
+def confirmation_status_name(status) -> str:
+    confirmation_status = status.confirmation_status
+    if confirmation_status is None:
+        # Nodes that predate confirmationStatus report null confirmations once rooted
+        return "finalized" if status.confirmations is None else "confirmed"
+    if confirmation_status == TransactionConfirmationStatus.Finalized:
+        return "finalized"
+    if confirmation_status == TransactionConfirmationStatus.Confirmed:
+        return "confirmed"
+    return "processed"
+
+
+class ConfirmationTracker:
+    """Tracks submitted transactions until they reach their target commitment.
+
+    Pending signatures are polled together with batched getSignatureStatuses
+    calls; the matching audit record is updated when each one settles.
+    """
+
+    def __init__(
+        self,
+        solana_service,
+        audit_service,
+        poll_interval: float = 1.0,
+        timeout: float = 120.0
+    ):
+        self.solana_service = solana_service
+        self.audit_service = audit_service
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._deadlines: Dict[str, float] = {}
+        self._failure_callbacks: Dict[str, List[Callable[[], Awaitable[Any]]]] = {}
+        self._completed = TTLCache(ttl=3600, max_size=10000)
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def track(
+        self,
+        signature: str,
+        commitment: str = "confirmed",
+        pubkeys: Iterable[str] = (),
+        on_failed: Optional[Callable[[], Awaitable[Any]]] = None
+    ) -> Dict[str, Any]:
+        if commitment not in COMMITMENT_LEVELS:
+            raise ValueError(f"Unsupported commitment: {commitment}")
+
+        existing = self._pending.get(signature)
+        if existing is not None:
+            # Keep the first entry; every caller's failure callback still runs
+            logger.warning(f"Signature {signature} is already being tracked")
+            existing["pubkeys"] = list(dict.fromkeys([*existing["pubkeys"], *pubkeys]))
+            if on_failed:
+                self._failure_callbacks.setdefault(signature, []).append(on_failed)
+            return existing
+
+        entry = {
+            "signature": signature,
+            "commitment": commitment,
+            "status": "submitted",
+            "pubkeys": list(pubkeys),
+            "last_valid_block_height": self.solana_service.blockhash_provider.last_valid_block_height,
+            "submitted_at": datetime.now(timezone.utc).isoformat(),
+        }
+        self._pending[signature] = entry
+        self._deadlines[signature] = time.monotonic() + self.timeout
+        if on_failed:
+            self._failure_callbacks[signature] = [on_failed]
+        return entry
+
+    def add_listener(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """Call ``callback(entry)`` when a tracked signature settles"""
+        self._listeners.append(callback)
+
+    def get_status(self, signature: str) -> Optional[Dict[str, Any]]:
+        entry = self._pending.get(signature) or self._completed.get(signature)
+        return dict(entry) if entry else None
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._poll_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _poll_loop(self) -> None:
+        while True:
+            if self._pending:
+                try:
+                    await self.poll_once()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Signature status poll failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def poll_once(self) -> None:
+        signatures = list(self._pending)
+        chunks = [
+            signatures[i:i + MAX_SIGNATURES_PER_REQUEST]
+            for i in range(0, len(signatures), MAX_SIGNATURES_PER_REQUEST)
+        ]
+        await asyncio.gather(*(self._poll_chunk(chunk) for chunk in chunks))
+
+    def _is_expired(self, signature: str, entry: Dict[str, Any]) -> bool:
+        if time.monotonic() > self._deadlines.get(signature, 0):
+            return True
+        provider = self.solana_service.blockhash_provider
+        if not entry["last_valid_block_height"] or not provider.last_valid_block_height:
+            return False
+        current_height = provider.last_valid_block_height - BLOCKHASH_VALIDITY_BLOCKS
+        return current_height > entry["last_valid_block_height"]
+
+    async def _poll_chunk(self, signatures) -> None:
+        response = await self.solana_service.client.get_signature_statuses(
+            [Signature.from_string(signature) for signature in signatures]
+        )
+
+        for signature, status in zip(signatures, response.value):
+            entry = self._pending.get(signature)
+            if entry is None:
+                continue
+
+            if status is None:
+                if self._is_expired(signature, entry):
+                    await self._complete(signature, "expired", "Transaction expired before confirmation")
+                continue
+
+            if status.err is not None:
+                await self._complete(signature, "failed", str(status.err))
+                continue
+
+            status_name = confirmation_status_name(status)
+            entry["status"] = status_name
+            entry["slot"] = status.slot
+            if COMMITMENT_LEVELS[status_name] >= COMMITMENT_LEVELS[entry["commitment"]]:
+                await self._complete(signature, status_name)
+
+    async def _complete(
+        self,
+        signature: str,
+        status: str,
+        error: Optional[str] = None
+    ) -> None:
+        entry = self._pending.pop(signature, None)
+        self._deadlines.pop(signature, None)
+        failure_callbacks = self._failure_callbacks.pop(signature, [])
+        if entry is None:
+            return
+
+        entry["status"] = status
+        entry["completed_at"] = datetime.now(timezone.utc).isoformat()
+        if error:
+            entry["error"] = error
+        self._completed.set(signature, entry)
+
+        if status in COMMITMENT_LEVELS:
+            self.solana_service.invalidate_balances(*entry["pubkeys"])
+        else:
+            for on_failed in failure_callbacks:
+                try:
+                    await on_failed()
+                except Exception as e:
+                    logger.error(f"Failure callback for {signature} raised: {e}")
+
+        try:
+            await self.audit_service.update_confirmation(signature, status, error)
+        except Exception as e:
+            logger.error(f"Error updating audit log for {signature}: {e}")
+
+        for callback in self._listeners:
+            try:
+                callback(dict(entry))
+            except Exception as e:
+                logger.error(f"Confirmation listener raised: {e}")
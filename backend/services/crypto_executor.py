@@ -0,0 +1,107 @@
+import os
+import base64
+import asyncio
+import logging
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+import bcrypt
+from solders.keypair import Keypair
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+logger = logging.getLogger(__name__)
+
+# Module-level so they can be pickled into a process pool
+
+
+def _hash_password(password: str) -> str:
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+
+
+def _check_password(password: str, password_hash: str) -> bool:
+    return bcrypt.checkpw(password.encode(), password_hash.encode())
+
+
+def _derive_key(passphrase: str, salt: bytes, iterations: int) -> bytes:
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=salt,
+        iterations=iterations,
+    )
+    return base64.urlsafe_b64encode(kdf.derive(passphrase.encode()))
+
+
+def _decrypt(key: bytes, token: bytes) -> bytes:
+    return Fernet(key).decrypt(token)
+
+
+def _generate_keys(count: int, encryption_key: Optional[bytes]) -> List[Tuple[str, str]]:
+    """Generate ``count`` keypairs as (pubkey, stored_key), Fernet-encrypted if a key is given"""
+    fernet = Fernet(encryption_key) if encryption_key else None
+    keys = []
+    for _ in range(count):
+        keypair = Keypair()
+        key_bytes = bytes(keypair)
+        if fernet is not None:
+            key_bytes = fernet.encrypt(key_bytes)
+        keys.append((str(keypair.pubkey()), base64.b64encode(key_bytes).decode()))
+    return keys
+
+
+class CryptoExecutor:
+    """Runs CPU-bound crypto (bcrypt, PBKDF2, Fernet, keygen) off the event loop.
+
+    ``kind`` is "thread" (bcrypt and OpenSSL release the GIL) or "process";
+    either way the pool is sized by ``max_workers`` and shared by all services.
+    """
+
+    def __init__(self, kind: str = "thread", max_workers: Optional[int] = None):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unsupported executor kind: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="crypto"
+                )
+        return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+
+    async def hash_password(self, password: str) -> str:
+        return await self.run(_hash_password, password)
+
+    async def check_password(self, password: str, password_hash: str) -> bool:
+        return await self.run(_check_password, password, password_hash)
+
+    async def derive_key(self, passphrase: str, salt: bytes, iterations: int) -> bytes:
+        return await self.run(_derive_key, passphrase, salt, iterations)
+
+    async def decrypt(self, key: bytes, token: bytes) -> bytes:
+        return await self.run(_decrypt, key, token)
+
+    async def generate_keys(self, count: int, encryption_key: Optional[bytes] = None) -> List[Tuple[str, str]]:
+        return await self.run(_generate_keys, count, encryption_key)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @classmethod
+    def from_env(cls) -> "CryptoExecutor":
+        workers = os.environ.get('CRYPTO_EXECUTOR_WORKERS')
+        return cls(
+            kind=os.environ.get('CRYPTO_EXECUTOR', 'thread'),
+            max_workers=int(workers) if workers else None
+        )
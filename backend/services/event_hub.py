@@ -0,0 +1,89 @@
+import json
+import asyncio
+from typing import Dict, Any, Iterable, Optional, Set
+
+# Subscribing to this topic receives every published event
+ALL_TOPICS = "*"
+
+
+class Subscription:
+    """A connection's bounded queue of pre-encoded events"""
+
+    def __init__(self, topics: Iterable[str], queue_size: int):
+        self.topics = frozenset(topics)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def offer(self, frame: str) -> None:
+        try:
+            self._queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # A slow client loses events instead of holding up everyone else
+            self.dropped += 1
+
+    async def get(self, timeout: float) -> Optional[str]:
+        """Next frame, or None if nothing arrived within ``timeout`` seconds"""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventHub:
+    """In-process fan-out of wallet events to server-sent event connections.
+
+    Publishers name the topics an event concerns (wallet ids or pubkeys).
+    Each event is encoded once and handed to every subscription interested
+    in any of its topics, without awaiting, so a publish costs one dict
+    lookup per topic and one queue put per receiving connection.
+    """
+
+    def __init__(self, queue_size: int = 256):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self.published = 0
+        self.delivered = 0
+
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        subscription = Subscription(topics, self.queue_size)
+        for topic in subscription.topics:
+            self._subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        for topic in subscription.topics:
+            subscribers = self._subscribers.get(topic)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[topic]
+
+    def has_subscribers(self, topic: str) -> bool:
+        return topic in self._subscribers or ALL_TOPICS in self._subscribers
+
+    def publish(self, topics: Iterable[str], event_type: str, data: Dict[str, Any]) -> None:
+        receivers: Set[Subscription] = set(self._subscribers.get(ALL_TOPICS, ()))
+        for topic in topics:
+            receivers.update(self._subscribers.get(topic, ()))
+        self.published += 1
+        if not receivers:
+            return
+        frame = encode_event(event_type, data)
+        for subscription in receivers:
+            subscription.offer(frame)
+        self.delivered += len(receivers)
+
+    def stats(self) -> Dict[str, Any]:
+        connections = set().union(*self._subscribers.values()) if self._subscribers else set()
+        return {
+            "connections": len(connections),
+            "topics": len(self._subscribers),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": sum(subscription.dropped for subscription in connections)
+        }
+
+
+def encode_event(event_type: str, data: Dict[str, Any]) -> str:
+    return f"event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
@@ -0,0 +1,153 @@
+import os
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+from solders.pubkey import Pubkey
+from solders.instruction import Instruction
+from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price
+
+from services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Percentile of recent prioritization fees paid per urgency level
+URGENCY_PERCENTILES = {
+    "low": 25,
+    "medium": 50,
+    "high": 75,
+    "urgent": 95,
+}
+
+SYSTEM_PROGRAM_ID = Pubkey.from_string("11111111111111111111111111111111")
+MEMO_PROGRAM_ID = Pubkey.from_string("MemoSq4gqABAXKb96qnH8TysNcWxMyWCqXgDLGmfcHr")
+
+# Conservative compute unit budgets for the programs our builders call
+PROGRAM_COMPUTE_UNITS = {
+    SYSTEM_PROGRAM_ID: 300,
+    MEMO_PROGRAM_ID: 15_000,
+}
+DEFAULT_INSTRUCTION_COMPUTE_UNITS = 200_000
+COMPUTE_BUDGET_COMPUTE_UNITS = 300
+MAX_COMPUTE_UNITS = 1_400_000
+
+GLOBAL_FEES_KEY = "global"
+
+
+def _percentile(sorted_values: List[int], percentile: int) -> int:
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, max(0, (len(sorted_values) * percentile + 99) // 100 - 1))
+    return sorted_values[index]
+
+
+def estimate_compute_units(instructions: Sequence[Instruction]) -> int:
+    units = COMPUTE_BUDGET_COMPUTE_UNITS + sum(
+        PROGRAM_COMPUTE_UNITS.get(instruction.program_id, DEFAULT_INSTRUCTION_COMPUTE_UNITS)
+        for instruction in instructions
+    )
+    return min(units, MAX_COMPUTE_UNITS)
+
+
+class FeeEstimator:
+    """Priority fee estimates from ``getRecentPrioritizationFees``.
+
+    Fees are sampled cluster-wide (no account filter) and refreshed in the
+    background every ``refresh_interval`` seconds, so sends read the cached
+    percentiles instead of waiting on RPC. Without the refresher (CLI), a
+    stale value is fetched inline through the ``RpcPool`` with a short deadline.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.deadline = float(os.environ.get('PRIORITY_FEE_DEADLINE', 2))
+        self.refresh_interval = float(os.environ.get('PRIORITY_FEE_REFRESH_INTERVAL', 2))
+        self.default_urgency = os.environ.get('PRIORITY_FEE_URGENCY', 'medium')
+        self.min_price = int(os.environ.get('PRIORITY_FEE_MIN_MICROLAMPORTS', 0))
+        self.max_price = int(os.environ.get('PRIORITY_FEE_MAX_MICROLAMPORTS', 1_000_000))
+        self.fee_cache = TTLCache(
+            ttl=float(os.environ.get('PRIORITY_FEE_CACHE_TTL', 5)),
+            max_size=1
+        )
+        # Last good sample, served while the refresher is behind
+        self._last_percentiles: Optional[Dict[int, int]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                self.fee_cache.set(GLOBAL_FEES_KEY, await self._fetch_percentiles())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Priority fee refresh failed: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    async def _fetch_percentiles(self) -> Dict[int, int]:
+        result = await self.client.request(
+            "getRecentPrioritizationFees",
+            [],
+            deadline=self.deadline
+        )
+        fees = sorted(entry["prioritizationFee"] for entry in result or [])
+        percentiles = {
+            percentile: _percentile(fees, percentile)
+            for percentile in URGENCY_PERCENTILES.values()
+        }
+        self._last_percentiles = percentiles
+        return percentiles
+
+    async def get_fee_percentiles(self) -> Optional[Dict[int, int]]:
+        """Recent fee percentiles; None if no sample has been taken yet"""
+        if self._task is not None and not self._task.done():
+            return self.fee_cache.get(GLOBAL_FEES_KEY) or self._last_percentiles
+        return await self.fee_cache.get_or_load(GLOBAL_FEES_KEY, self._fetch_percentiles)
+
+    async def get_compute_unit_price(self, urgency: Optional[str] = None) -> Optional[int]:
+        """Micro-lamports per compute unit for ``urgency``; None means no priority fee"""
+        urgency = urgency or self.default_urgency
+        if urgency == "none":
+            return None
+        if urgency not in URGENCY_PERCENTILES:
+            raise ValueError(f"Unsupported urgency: {urgency}")
+
+        try:
+            percentiles = await self.get_fee_percentiles()
+            price = percentiles[URGENCY_PERCENTILES[urgency]] if percentiles else self.min_price
+        except Exception as e:
+            logger.warning(f"Priority fee estimate failed, using minimum: {e}")
+            price = self.min_price
+        return min(max(price, self.min_price), self.max_price)
+
+    async def compute_budget_instructions(
+        self,
+        instructions: Sequence[Instruction],
+        urgency: Optional[str] = None
+    ) -> List[Instruction]:
+        """SetComputeUnitLimit/SetComputeUnitPrice to prepend to ``instructions``"""
+        price = await self.get_compute_unit_price(urgency)
+        if price is None:
+            return []
+        return [
+            set_compute_unit_limit(estimate_compute_units(instructions)),
+            set_compute_unit_price(price),
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.fee_cache.stats(),
+            "refreshing": self._task is not None and not self._task.done(),
+            "percentiles": self._last_percentiles
+        }
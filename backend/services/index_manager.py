@@ -0,0 +1,76 @@
+import logging
+from typing import Dict, Any, List, Iterable, Set
+
+logger = logging.getLogger(__name__)
+
+
+def _collect_stages(plan: Any, stages: Set[str]) -> Set[str]:
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.add(plan["stage"])
+        for value in plan.values():
+            _collect_stages(value, stages)
+    elif isinstance(plan, list):
+        for item in plan:
+            _collect_stages(item, stages)
+    return stages
+
+
+class IndexManager:
+    """Creates the indexes services declare and checks their hot query plans.
+
+    Services declare ``INDEXES`` as ``{collection: [IndexModel, ...]}`` and
+    ``HOT_QUERIES`` as ``[(collection, filter, sort), ...]``.
+    """
+
+    def __init__(self, db, services: Iterable[Any]):
+        self.db = db
+        self.services = list(services)
+
+    def declared_indexes(self) -> Dict[str, List[Any]]:
+        indexes: Dict[str, List[Any]] = {}
+        for service in self.services:
+            for collection_name, models in getattr(service, "INDEXES", {}).items():
+                indexes.setdefault(collection_name, []).extend(models)
+        return indexes
+
+    async def ensure_indexes(self) -> Dict[str, List[str]]:
+        """Create declared indexes; existing identical indexes are left untouched"""
+        created = {}
+        for collection_name, models in self.declared_indexes().items():
+            try:
+                created[collection_name] = await self.db[collection_name].create_indexes(models)
+            except Exception as e:
+                logger.error(f"Error creating indexes on {collection_name}: {e}")
+        logger.info(f"Indexes ensured on {len(created)} collections")
+        return created
+
+    async def check_query_plans(self) -> List[Dict[str, Any]]:
+        """Explain each service's hot queries and flag any that use a COLLSCAN"""
+        report = []
+        for service in self.services:
+            for collection_name, query, sort in getattr(service, "HOT_QUERIES", []):
+                entry = {
+                    "service": type(service).__name__,
+                    "collection": collection_name,
+                    "filter": query,
+                    "sort": sort,
+                }
+                try:
+                    cursor = self.db[collection_name].find(query)
+                    if sort:
+                        cursor = cursor.sort(sort)
+                    plan = await cursor.limit(1).explain()
+                    winning_plan = plan.get("queryPlanner", {}).get("winningPlan", {})
+                    stages = _collect_stages(winning_plan, set())
+                    entry["stages"] = sorted(stages)
+                    entry["collscan"] = "COLLSCAN" in stages
+                    if entry["collscan"]:
+                        logger.warning(
+                            f"Hot query on {collection_name} uses a COLLSCAN: filter={query} sort={sort}"
+                        )
+                except Exception as e:
+                    logger.error(f"Error explaining query on {collection_name}: {e}")
+                    entry["error"] = str(e)
+                report.append(entry)
+        return report
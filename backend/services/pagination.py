@@ -0,0 +1,87 @@
+import re
+import base64
+import binascii
+from typing import Dict, Any, List, Optional, Tuple
+from bson import json_util
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Encode the sort-key values of the last document into an opaque token"""
+    return base64.urlsafe_b64encode(json_util.dumps(values).encode()).decode()
+
+
+def decode_cursor(token: str) -> List[Any]:
+    try:
+        values = json_util.loads(base64.urlsafe_b64decode(token.encode()))
+    except (binascii.Error, ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def keyset_filter(sort: List[Tuple[str, int]], values: List[Any]) -> Dict[str, Any]:
+    """Match documents strictly after ``values`` in ``sort`` order"""
+    if len(values) != len(sort):
+        raise ValueError("Invalid cursor")
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {prev_field: value for (prev_field, _), value in zip(sort[:i], values[:i])}
+        clause[field] = {"$lt" if direction < 0 else "$gt": values[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+
+async def fetch_page(
+    collection,
+    query: Dict[str, Any],
+    sort: List[Tuple[str, int]],
+    limit: int,
+    cursor: Optional[str] = None,
+    projection: Optional[Dict[str, Any]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Fetch one keyset page; ``sort`` must end in a unique field such as ``_id``.
+
+    The projection must keep the sort fields. ``_id`` is stripped from results.
+    """
+    if cursor:
+        query = {"$and": [query, keyset_filter(sort, decode_cursor(cursor))]}
+
+    docs = await collection.find(query, projection).sort(sort).limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor([docs[-1].get(field) for field, _ in sort])
+
+    for doc in docs:
+        doc.pop("_id", None)
+    return docs, next_cursor
+
+
+def build_projection(
+    fields: Optional[List[str]],
+    allowed: Tuple[str, ...],
+    sort: List[Tuple[str, int]]
+) -> Tuple[Dict[str, Any], List[str]]:
+    """Projection for caller-selected ``fields`` that keeps the sort keys.
+
+    Returns the projection and the sort fields the caller did not ask for, to
+    be dropped from each document after the cursor has been computed.
+    """
+    selected = list(fields) if fields else list(allowed)
+    unknown = [field for field in selected if field not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    projection: Dict[str, Any] = {field: 1 for field in selected}
+    extra = []
+    for field, _ in sort:
+        if field not in projection and field != "_id":
+            projection[field] = 1
+            extra.append(field)
+    return projection, extra
+
+
+def prefix_regex(prefix: str) -> Dict[str, Any]:
+    """Anchored, case-sensitive match so Mongo can bound the scan on an index"""
+    return {"$regex": f"^{re.escape(prefix)}"}
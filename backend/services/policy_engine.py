@@ -0,0 +1,213 @@
+"""Declarative agent policies compiled into reusable evaluators.
+
+A policy is a dict. Top-level keys set defaults for every action and
+``rules`` overrides them per action type:
+
+    {
+        "max_transaction_amount": 0.5,
+        "auto_approve_below": 0.1,
+        "default_action": "allow",             # or "deny" for unlisted actions
+        "allowed_destinations": [...],         # / "denied_destinations"
+        "allowed_mints": [...],                # / "denied_mints"
+        "rate_limit": {"max_actions": 10, "window_seconds": 60},
+        "time_windows": [{"days": [0, 1, 2, 3, 4], "start": "09:00", "end": "17:00"}],
+        "rules": {
+            "transfer": {"max_amount": 0.25, "denied_destinations": [...]},
+            "swap": {"allowed_mints": [...]},
+            "airdrop": {"allowed": False}
+        }
+    }
+
+Days are 0 (Monday) to 6 and times are UTC.
+"""
+
+import copy
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, List, Tuple, FrozenSet, Deque
+
+DESTINATION_PARAMS = ("to", "to_address", "destination")
+MINT_PARAMS = ("mint", "input_mint", "output_mint")
+
+
+def _to_set(values: Optional[List[str]]) -> Optional[FrozenSet[str]]:
+    return frozenset(values) if values is not None else None
+
+
+def _parse_minutes(value: str) -> int:
+    hours, _, minutes = value.partition(":")
+    return int(hours) * 60 + int(minutes or 0)
+
+
+class _ActionRule:
+    __slots__ = (
+        "allowed", "max_amount", "min_amount", "auto_approve_below",
+        "allowed_destinations", "denied_destinations",
+        "allowed_mints", "denied_mints",
+        "rate_limit", "time_windows"
+    )
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.allowed = spec.get("allowed", True)
+        self.max_amount = spec.get("max_amount", spec.get("max_transaction_amount"))
+        self.min_amount = spec.get("min_amount")
+        self.auto_approve_below = spec.get("auto_approve_below")
+        self.allowed_destinations = _to_set(spec.get("allowed_destinations"))
+        self.denied_destinations = _to_set(spec.get("denied_destinations")) or frozenset()
+        self.allowed_mints = _to_set(spec.get("allowed_mints"))
+        self.denied_mints = _to_set(spec.get("denied_mints")) or frozenset()
+
+        rate_limit = spec.get("rate_limit")
+        self.rate_limit: Optional[Tuple[int, float]] = (
+            (int(rate_limit["max_actions"]), float(rate_limit["window_seconds"]))
+            if rate_limit else None
+        )
+
+        self.time_windows: Optional[List[Tuple[Optional[FrozenSet[int]], int, int]]] = None
+        if spec.get("time_windows") is not None:
+            self.time_windows = [
+                (
+                    _to_set(window.get("days")),
+                    _parse_minutes(window.get("start", "00:00")),
+                    _parse_minutes(window.get("end", "24:00"))
+                )
+                for window in spec["time_windows"]
+            ]
+
+
+class CompiledPolicy:
+    """Evaluator built once from a policy dict; holds per-action rate-limit state"""
+
+    _RULE_KEYS = (
+        "max_transaction_amount", "auto_approve_below",
+        "allowed_destinations", "denied_destinations",
+        "allowed_mints", "denied_mints",
+        "rate_limit", "time_windows"
+    )
+
+    def __init__(self, policy: Dict[str, Any]):
+        self.source = copy.deepcopy(policy)
+        defaults = {key: policy[key] for key in self._RULE_KEYS if key in policy}
+
+        self._default_rule = _ActionRule(defaults)
+        self._default_rule.allowed = policy.get("default_action", "allow") == "allow"
+        self._rules: Dict[str, _ActionRule] = {
+            action_type: _ActionRule({**defaults, **spec})
+            for action_type, spec in policy.get("rules", {}).items()
+        }
+        allowed_actions = policy.get("allowed_actions")
+        if allowed_actions is not None:
+            for action_type, rule in self._rules.items():
+                rule.allowed = rule.allowed and action_type in allowed_actions
+            for action_type in allowed_actions:
+                self._rules.setdefault(action_type, _ActionRule(defaults))
+            self._default_rule.allowed = False
+        self._history: Dict[str, Deque[float]] = {}
+
+    def matches(self, policy: Dict[str, Any]) -> bool:
+        return self.source == policy
+
+    def evaluate(
+        self,
+        action_type: str,
+        params: Dict[str, Any],
+        now: Optional[datetime] = None,
+        record: bool = True
+    ) -> Dict[str, Any]:
+        now = now or datetime.now(timezone.utc)
+        return self._evaluate(action_type, params, now, time.monotonic(), record)
+
+    def evaluate_batch(
+        self,
+        actions: List[Tuple[str, Dict[str, Any]]],
+        now: Optional[datetime] = None,
+        record: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Evaluate many candidate actions in one pass against the same clock.
+
+        Rate limits count earlier approvals in the batch; state is only kept
+        when ``record`` is true.
+        """
+        now = now or datetime.now(timezone.utc)
+        monotonic_now = time.monotonic()
+        saved_history = None if record else {k: deque(v) for k, v in self._history.items()}
+        try:
+            return [
+                self._evaluate(action_type, params, now, monotonic_now, True)
+                for action_type, params in actions
+            ]
+        finally:
+            if saved_history is not None:
+                self._history = saved_history
+
+    def _deny(self, reason: str) -> Dict[str, Any]:
+        return {"approved": False, "reason": reason, "decision_type": "rule-based"}
+
+    def _evaluate(
+        self,
+        action_type: str,
+        params: Dict[str, Any],
+        now: datetime,
+        monotonic_now: float,
+        record: bool
+    ) -> Dict[str, Any]:
+        rule = self._rules.get(action_type, self._default_rule)
+
+        if not rule.allowed:
+            return self._deny(f"Action {action_type} is not allowed by policy")
+
+        amount = params.get("amount", 0)
+        if rule.max_amount is not None and amount > rule.max_amount:
+            return self._deny(f"Amount {amount} exceeds policy limit {rule.max_amount}")
+        if rule.min_amount is not None and amount < rule.min_amount:
+            return self._deny(f"Amount {amount} is below policy minimum {rule.min_amount}")
+
+        if rule.allowed_destinations is not None or rule.denied_destinations:
+            for key in DESTINATION_PARAMS:
+                destination = params.get(key)
+                if destination is None:
+                    continue
+                if destination in rule.denied_destinations:
+                    return self._deny(f"Destination {destination} is denied by policy")
+                if rule.allowed_destinations is not None and destination not in rule.allowed_destinations:
+                    return self._deny(f"Destination {destination} is not in the allow list")
+
+        if rule.allowed_mints is not None or rule.denied_mints:
+            for key in MINT_PARAMS:
+                mint = params.get(key)
+                if mint is None:
+                    continue
+                if mint in rule.denied_mints:
+                    return self._deny(f"Mint {mint} is denied by policy")
+                if rule.allowed_mints is not None and mint not in rule.allowed_mints:
+                    return self._deny(f"Mint {mint} is not in the allow list")
+
+        if rule.time_windows is not None:
+            weekday = now.weekday()
+            minute = now.hour * 60 + now.minute
+            if not any(
+                (days is None or weekday in days) and start <= minute < end
+                for days, start, end in rule.time_windows
+            ):
+                return self._deny(f"Action {action_type} is outside the allowed time windows")
+
+        if rule.rate_limit is not None:
+            max_actions, window_seconds = rule.rate_limit
+            history = self._history.setdefault(action_type, deque())
+            while history and history[0] <= monotonic_now - window_seconds:
+                history.popleft()
+            if len(history) >= max_actions:
+                return self._deny(
+                    f"Rate limit of {max_actions} {action_type} actions per {window_seconds:g}s exceeded"
+                )
+            if record:
+                history.append(monotonic_now)
+
+        return {
+            "approved": True,
+            "action": action_type,
+            "params": params,
+            "decision_type": "rule-based",
+            "auto_execute": rule.auto_approve_below is not None and amount <= rule.auto_approve_below
+        }
@@ -0,0 +1,66 @@
+import time
+import asyncio
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """Async token bucket refilled at ``rate`` tokens per second up to ``burst``.
+
+    Waiters are served in arrival order, so a steady stream of callers is paced
+    at exactly ``rate`` instead of stampeding whenever a token frees up.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.waited = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> bool:
+        """Take a token only if one is free now and nobody is waiting for one"""
+        if self._lock.locked():
+            return False
+        self._refill(time.monotonic())
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def wait_time(self) -> float:
+        """Seconds until a new caller would get a token"""
+        self._refill(time.monotonic())
+        return max(0.0, (1 - self._tokens) / self.rate)
+
+    async def acquire(self, deadline: Optional[float] = None) -> bool:
+        """Take one token, waiting at most until ``deadline`` (monotonic); False on timeout"""
+        async with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            wait = (1 - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            # Claim the token now; holding the lock while sleeping keeps FIFO order
+            self._tokens -= 1
+            self.waited += wait
+            await asyncio.sleep(wait)
+            return True
+
+    def stats(self) -> Dict[str, float]:
+        self._refill(time.monotonic())
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "available": round(max(self._tokens, 0.0), 2),
+            "waited_seconds": round(self.waited, 3)
+        }
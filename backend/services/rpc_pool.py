@@ -0,0 +1,388 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple
+import httpx
+from solana.rpc.async_api import AsyncClient
+from solana.exceptions import SolanaRpcException
+
+from services.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Methods that change chain state go to the primary endpoint first
+WRITE_METHODS = frozenset({
+    "send_transaction",
+    "send_raw_transaction",
+    "request_airdrop",
+})
+
+# Rate-limit class per method; everything else counts as a read
+METHOD_CLASSES = {
+    "send_transaction": "sends",
+    "send_raw_transaction": "sends",
+    "request_airdrop": "airdrops",
+}
+
+# Requests per second per endpoint, overridable with RPC_RATE_LIMITS="reads:10,sends:4"
+DEFAULT_RATE_LIMITS = {
+    "reads": 10.0,
+    "sends": 4.0,
+    "airdrops": 0.2,
+}
+
+# Transport-level failures that make another endpoint worth trying; JSON-RPC
+# errors (bad params, preflight failures) would fail the same way everywhere
+FAILOVER_ERRORS = (SolanaRpcException, httpx.HTTPError, asyncio.TimeoutError, OSError)
+
+
+class RpcError(Exception):
+    """An RPC call could not be completed on any endpoint"""
+
+    def __init__(
+        self,
+        message: str,
+        method: str,
+        retry_after: Optional[float] = None,
+        maybe_processed: bool = False
+    ):
+        super().__init__(message)
+        self.method = method
+        self.retry_after = retry_after
+        # True if an attempt failed after reaching an endpoint (timeout, dropped
+        # connection, 5xx), so a write may have been applied despite the error
+        self.maybe_processed = maybe_processed
+        # Set by senders to the transaction signature when maybe_processed
+        self.signature: Optional[str] = None
+
+
+class RpcRateLimitedError(RpcError):
+    """Client-side or endpoint rate limits kept the call from running before its deadline"""
+
+
+class RpcUnavailableError(RpcError):
+    """Every endpoint failed or timed out until the call's deadline"""
+
+
+def _http_status(error: BaseException) -> Tuple[Optional[int], Optional[float]]:
+    """Status code and Retry-After of the HTTP response behind a wrapped client error"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, httpx.HTTPStatusError):
+            retry_after = error.response.headers.get("retry-after")
+            try:
+                retry_after = float(retry_after) if retry_after is not None else None
+            except ValueError:
+                retry_after = None
+            return error.response.status_code, retry_after
+        error = error.__cause__ or error.__context__
+    return None, None
+
+
+def _parse_rate_limits(spec: str) -> Dict[str, float]:
+    limits = dict(DEFAULT_RATE_LIMITS)
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        method_class, _, rate = item.partition(':')
+        limits[method_class.strip()] = float(rate)
+    return limits
+
+
+# Below this (decayed) error rate an endpoint with no latency sample is probed again
+PROBE_ERROR_RATE = 0.05
+
+
+class RpcEndpoint:
+    """Health state for one RPC URL: EWMA latency and error rate plus a circuit breaker.
+
+    The error rate also halves every ``error_half_life`` seconds without a
+    failure, so an endpoint demoted by transient errors is routed to again
+    and can earn back its score.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        client: AsyncClient,
+        alpha: float,
+        rate_limits: Optional[Dict[str, float]] = None,
+        error_half_life: float = 30.0
+    ):
+        self.url = url
+        self.client = client
+        self.alpha = alpha
+        self.error_half_life = error_half_life
+        self.buckets = {
+            method_class: TokenBucket(rate)
+            for method_class, rate in (rate_limits or {}).items()
+            if rate > 0
+        }
+        self.latency: Optional[float] = None
+        self._error_rate = 0.0
+        self._error_updated = time.monotonic()
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.requests = 0
+        self.failures = 0
+
+    def available(self, now: float) -> bool:
+        # After the cooldown the circuit is half-open: calls are let through
+        # and the next failure re-opens it immediately
+        return now >= self.open_until
+
+    @property
+    def error_rate(self) -> float:
+        elapsed = time.monotonic() - self._error_updated
+        return self._error_rate * 0.5 ** (elapsed / self.error_half_life)
+
+    def _set_error_rate(self, error_rate: float) -> None:
+        self._error_rate = error_rate
+        self._error_updated = time.monotonic()
+
+    def score(self) -> float:
+        if self.latency is None:
+            # Untried endpoints score 0 so they get probed first; ones that have
+            # only failed go behind every endpoint with a latency sample until
+            # their error rate has decayed
+            return float("inf") if self.error_rate >= PROBE_ERROR_RATE and self.failures else 0.0
+        return self.latency * (1.0 + 10.0 * self.error_rate)
+
+    def record_success(self, latency: float) -> None:
+        self.requests += 1
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.latency = latency if self.latency is None else (
+            self.alpha * latency + (1 - self.alpha) * self.latency
+        )
+        self._set_error_rate(self.error_rate * (1 - self.alpha))
+
+    def record_failure(self, failure_threshold: int, cooldown: float) -> None:
+        self.requests += 1
+        self.failures += 1
+        self.consecutive_failures += 1
+        self._set_error_rate(self.alpha + (1 - self.alpha) * self.error_rate)
+        if self.consecutive_failures >= failure_threshold:
+            self.open_until = time.monotonic() + cooldown
+            logger.warning(
+                f"RPC endpoint {self.url} failed {self.consecutive_failures} times, "
+                f"circuit open for {cooldown:g}s"
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "latency_ms": round(self.latency * 1000, 2) if self.latency is not None else None,
+            "error_rate": round(self.error_rate, 4),
+            "circuit_open": not self.available(time.monotonic()),
+            "requests": self.requests,
+            "failures": self.failures,
+            "rate_limits": {
+                method_class: bucket.stats()
+                for method_class, bucket in self.buckets.items()
+            }
+        }
+
+
+class RpcPool:
+    """Drop-in stand-in for ``AsyncClient`` spread over several RPC endpoints.
+
+    Any ``AsyncClient`` method can be called on the pool. Reads go to the
+    available endpoint with the best latency/error score; writes go to the
+    primary (the first URL) and fail over in score order. An endpoint whose
+    calls fail ``failure_threshold`` times in a row is skipped for
+    ``cooldown`` seconds; if every circuit is open all endpoints are tried anyway.
+
+    Each endpoint paces calls with a token bucket per method class (reads,
+    sends, airdrops); endpoints with a free token are tried before waiting
+    on any bucket. 429, 5xx and transport failures are retried with
+    jittered exponential backoff until ``deadline`` seconds after the call
+    started, after which an ``RpcError`` subclass is raised.
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        alpha: float = 0.2,
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        timeout: float = 10.0,
+        client_factory: Optional[Callable[[str], AsyncClient]] = None,
+        rate_limits: Optional[Dict[str, float]] = None,
+        deadline: float = 20.0,
+        backoff_base: float = 0.25,
+        backoff_max: float = 4.0,
+        error_half_life: float = 30.0
+    ):
+        if not urls:
+            raise ValueError("RpcPool needs at least one endpoint")
+        client_factory = client_factory or (lambda url: AsyncClient(url, timeout=timeout))
+        self.timeout = timeout
+        # Shared by ``request`` for JSON-RPC methods AsyncClient does not wrap
+        self._http: Optional[httpx.AsyncClient] = None
+        self.endpoints = [
+            RpcEndpoint(url, client_factory(url), alpha, rate_limits, error_half_life)
+            for url in urls
+        ]
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.deadline = deadline
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    @property
+    def primary(self) -> RpcEndpoint:
+        return self.endpoints[0]
+
+    def _route(self, write: bool) -> List[RpcEndpoint]:
+        now = time.monotonic()
+        available = [endpoint for endpoint in self.endpoints if endpoint.available(now)]
+        if not available:
+            available = list(self.endpoints)
+        ordered = sorted(available, key=RpcEndpoint.score)
+        if write and self.primary in ordered:
+            ordered.remove(self.primary)
+            ordered.insert(0, self.primary)
+        return ordered
+
+    async def call(self, method: str, *args, deadline: Optional[float] = None, **kwargs) -> Any:
+        """Call ``AsyncClient.<method>`` on the best endpoint, failing over and retrying"""
+        return await self._call(
+            method,
+            lambda endpoint: getattr(endpoint.client, method)(*args, **kwargs),
+            deadline
+        )
+
+    async def request(self, rpc_method: str, params: List[Any], deadline: Optional[float] = None) -> Any:
+        """Raw JSON-RPC call returning ``result``, routed and rate limited like ``call``"""
+        return await self._call(
+            rpc_method,
+            lambda endpoint: self._post(endpoint.url, rpc_method, params),
+            deadline
+        )
+
+    async def _post(self, url: str, rpc_method: str, params: List[Any]) -> Any:
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=self.timeout)
+        response = await self._http.post(
+            url,
+            json={"jsonrpc": "2.0", "id": 1, "method": rpc_method, "params": params}
+        )
+        response.raise_for_status()
+        payload = response.json()
+        if "error" in payload:
+            # JSON-RPC errors would fail the same way on every endpoint
+            raise RuntimeError(payload["error"].get("message", f"{rpc_method} failed"))
+        return payload.get("result")
+
+    async def _call(
+        self,
+        method: str,
+        invoke: Callable[[RpcEndpoint], Awaitable[Any]],
+        deadline: Optional[float]
+    ) -> Any:
+        method_class = METHOD_CLASSES.get(method, "reads")
+        deadline_at = time.monotonic() + (deadline if deadline is not None else self.deadline)
+        last_error: Optional[BaseException] = None
+        rate_limited = False
+        retry_after: Optional[float] = None
+        maybe_processed = False
+        attempt = 0
+
+        while True:
+            retryable = False
+            candidates = self._route(method in WRITE_METHODS)
+            throttled: List[RpcEndpoint] = []
+            while candidates or throttled:
+                if candidates:
+                    endpoint = candidates.pop(0)
+                    bucket = endpoint.buckets.get(method_class)
+                    if bucket is not None and not bucket.try_acquire():
+                        throttled.append(endpoint)
+                        continue
+                else:
+                    # No endpoint had a free token: wait for the one that frees up soonest
+                    endpoint = min(throttled, key=lambda e: e.buckets[method_class].wait_time())
+                    throttled = []
+                    if not await endpoint.buckets[method_class].acquire(deadline_at):
+                        rate_limited = retryable = True
+                        break
+                started = time.monotonic()
+                try:
+                    result = await invoke(endpoint)
+                except FAILOVER_ERRORS as e:
+                    endpoint.record_failure(self.failure_threshold, self.cooldown)
+                    status, retry_after = _http_status(e)
+                    logger.warning(f"RPC {method} failed on {endpoint.url} ({status or 'transport'}): {e}")
+                    last_error = e
+                    rate_limited = status == 429
+                    maybe_processed = maybe_processed or status is None or status >= 500
+                    # Other 4xx responses (auth, bad request) will not improve with retries
+                    retryable = retryable or status is None or status == 429 or status >= 500
+                    continue
+                endpoint.record_success(time.monotonic() - started)
+                return result
+
+            if not retryable:
+                raise RpcUnavailableError(
+                    f"RPC {method} rejected: {last_error}",
+                    method,
+                    maybe_processed=maybe_processed
+                ) from last_error
+
+            # Full jitter keeps many callers from retrying in lockstep
+            backoff = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+            backoff = max(backoff, retry_after or 0.0)
+            attempt += 1
+            if time.monotonic() + backoff >= deadline_at:
+                error_type = RpcRateLimitedError if rate_limited else RpcUnavailableError
+                raise error_type(
+                    f"RPC {method} did not complete within its deadline: {last_error or 'rate limited'}",
+                    method,
+                    retry_after=retry_after,
+                    maybe_processed=maybe_processed
+                ) from last_error
+            await asyncio.sleep(backoff)
+
+    def __getattr__(self, name: str):
+        if name.startswith("_") or not callable(getattr(AsyncClient, name, None)):
+            raise AttributeError(name)
+
+        async def method(*args, **kwargs):
+            return await self.call(name, *args, **kwargs)
+
+        method.__name__ = name
+        return method
+
+    async def close(self) -> None:
+        await asyncio.gather(*(endpoint.client.close() for endpoint in self.endpoints))
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [endpoint.stats() for endpoint in self.endpoints]
+
+    @classmethod
+    def from_env(cls, default_url: str) -> "RpcPool":
+        """Build a pool from SOLANA_RPC_URLS (comma-separated, primary first)"""
+        urls = [
+            url.strip()
+            for url in os.environ.get('SOLANA_RPC_URLS', '').split(',')
+            if url.strip()
+        ] or [default_url]
+        return cls(
+            urls,
+            alpha=float(os.environ.get('RPC_EWMA_ALPHA', 0.2)),
+            failure_threshold=int(os.environ.get('RPC_CIRCUIT_FAILURES', 3)),
+            cooldown=float(os.environ.get('RPC_CIRCUIT_COOLDOWN', 30)),
+            timeout=float(os.environ.get('RPC_TIMEOUT', 10)),
+            rate_limits=_parse_rate_limits(os.environ.get('RPC_RATE_LIMITS', '')),
+            deadline=float(os.environ.get('RPC_CALL_DEADLINE', 20)),
+            backoff_base=float(os.environ.get('RPC_BACKOFF_BASE', 0.25)),
+            backoff_max=float(os.environ.get('RPC_BACKOFF_MAX', 4)),
+            error_half_life=float(os.environ.get('RPC_ERROR_HALF_LIFE', 30))
+        )
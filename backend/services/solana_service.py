@@ -1,60 +1,243 @@
 import os
 import asyncio
-from typing import Dict, Any, Optional
-from solana.rpc.async_api import AsyncClient
-from solana.rpc.commitment import Confirmed
+from typing import Dict, Any, Optional, List, Sequence, Tuple
+from solana.rpc.commitment import Commitment, Processed, Confirmed, Finalized
+from solana.rpc.types import DataSliceOpts
 from solders.keypair import Keypair
 from solders.pubkey import Pubkey
+from solders.signature import Signature
 from solders.system_program import TransferParams, transfer
 from solders.transaction import Transaction
 from solders.message import Message
+from solders.hash import Hash
 from solders.instruction import Instruction, AccountMeta
+from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price
 import logging
 
+from services.cache import TTLCache
+from services.blockhash_provider import BlockhashProvider, BLOCKHASH_VALIDITY_BLOCKS, SLOT_TIME_SECONDS
+from services.confirmation_tracker import confirmation_status_name
+from services.fee_estimator import FeeEstimator
+from services.rpc_pool import RpcPool, RpcError
+
 logger = logging.getLogger(__name__)
 
+# getMultipleAccounts accepts at most 100 pubkeys per request
+MAX_ACCOUNTS_PER_REQUEST = 100
+
+# Maximum size of a serialized transaction (one network packet)
+PACKET_DATA_SIZE = 1232
+
+# Balance cache TTL in seconds per commitment level
+DEFAULT_BALANCE_CACHE_TTLS = {
+    Processed: 1.0,
+    Confirmed: 2.0,
+    Finalized: 5.0,
+}
+
+class DuplicateTransactionError(Exception):
+    """An identical transaction (same signature) was already sent within its blockhash window"""
+
+
 class SolanaService:
     def __init__(self):
         network = os.environ.get('SOLANA_NETWORK', 'devnet')
         if network == 'devnet':
-            self.rpc_url = "https://api.devnet.solana.com"
+            default_url = "https://api.devnet.solana.com"
         elif network == 'testnet':
-            self.rpc_url = "https://api.testnet.solana.com"
+            default_url = "https://api.testnet.solana.com"
         else:
-            self.rpc_url = "https://api.mainnet-beta.solana.com"
+            default_url = "https://api.mainnet-beta.solana.com"
         
-        self.client = AsyncClient(self.rpc_url)
+        self.client = RpcPool.from_env(default_url)
+        self.rpc_url = self.client.primary.url
         self.network = network
+        
+        self.balance_cache_ttls = {
+            commitment: float(os.environ.get(
+                f"BALANCE_CACHE_TTL_{commitment.upper()}", default_ttl
+            ))
+            for commitment, default_ttl in DEFAULT_BALANCE_CACHE_TTLS.items()
+        }
+        self.balance_cache = TTLCache(
+            ttl=self.balance_cache_ttls[Confirmed],
+            max_size=int(os.environ.get('BALANCE_CACHE_MAX_SIZE', 10000))
+        )
+        self.blockhash_provider = BlockhashProvider(
+            self.client,
+            refresh_interval=int(os.environ.get('BLOCKHASH_REFRESH_INTERVAL_MS', 400)) / 1000
+        )
+        self.fee_estimator = FeeEstimator(self.client)
+        # Signatures sent while their blockhash is still valid; re-sending an
+        # identical transaction would be silently deduplicated on-chain
+        self.recent_signatures = TTLCache(
+            ttl=BLOCKHASH_VALIDITY_BLOCKS * SLOT_TIME_SECONDS * 1.5,
+            max_size=int(os.environ.get('RECENT_SIGNATURES_MAX_SIZE', 100000))
+        )
+        # Set to an AccountMirror to answer confirmed balance reads from websocket updates
+        self.account_mirror = None
+    
+    def start(self) -> None:
+        """Start background tasks; call from within the running event loop"""
+        self.blockhash_provider.start()
+        self.fee_estimator.start()
+    
+    async def _sign_transaction(
+        self,
+        instructions: Sequence[Instruction],
+        signer: Keypair,
+        urgency: Optional[str] = None
+    ) -> Transaction:
+        budget_ixs = await self.fee_estimator.compute_budget_instructions(instructions, urgency)
+        blockhash = await self.blockhash_provider.get_blockhash()
+        return Transaction.new_signed_with_payer(
+            [*budget_ixs, *instructions],
+            signer.pubkey(),
+            [signer],
+            blockhash
+        )
     
-    async def get_balance(self, pubkey_str: str) -> float:
+    async def _send(self, txn: Transaction):
+        """Send ``txn`` unless an identical transaction is still in its blockhash window"""
+        signature = str(txn.signatures[0])
+        if signature in self.recent_signatures:
+            raise DuplicateTransactionError(
+                f"Identical transaction {signature} was already submitted; retry shortly"
+            )
+        self.recent_signatures.set(signature, True)
         try:
-            pubkey = Pubkey.from_string(pubkey_str)
-            response = await self.client.get_balance(pubkey, commitment=Confirmed)
-            if response.value is not None:
-                return response.value / 1_000_000_000
-            return 0.0
-        except Exception as e:
-            logger.error(f"Error getting balance: {e}")
-            return 0.0
+            response = await self.client.send_transaction(txn)
+        except BaseException as e:
+            self.recent_signatures.invalidate(signature)
+            if isinstance(e, RpcError) and e.maybe_processed:
+                # The send may still land; callers track the signature instead of treating it as failed
+                e.signature = signature
+            raise
+        if not response.value:
+            self.recent_signatures.invalidate(signature)
+        return response
+    
+    async def _confirm(self, signature: Signature, commitment: Commitment) -> str:
+        """Wait for ``commitment``; returns "timeout" if it was not observed.
 
-    async def get_spl_balance(self, owner_pubkey_str: str, token_mint_str: str) -> float:
+        The transaction has already been sent, so a failure here must not be
+        reported as a failed transfer.
+        """
         try:
-            owner_pubkey = Pubkey.from_string(owner_pubkey_str)
-            mint_pubkey = Pubkey.from_string(token_mint_str)
-            
-            from solana.rpc.types import TokenAccountOpts
-            opts = TokenAccountOpts(mint=mint_pubkey)
-            response = await self.client.get_token_accounts_by_owner(owner_pubkey, opts, commitment=Confirmed)
-            
-            if response.value:
-                account_pubkey = response.value[0].pubkey
-                balance_response = await self.client.get_token_account_balance(account_pubkey, commitment=Confirmed)
-                if balance_response.value:
-                    return balance_response.value.ui_amount
-            return 0.0
+            await self.client.confirm_transaction(signature, commitment=commitment)
+            return commitment
         except Exception as e:
-            logger.error(f"Error getting SPL balance: {e}")
-            return 0.0
+            logger.warning(f"Confirmation of {signature} not observed: {e}")
+            return "timeout"
+    
+    async def get_balance(self, pubkey_str: str, commitment: Commitment = Confirmed) -> float:
+        """SOL balance; raises ``RpcError`` rather than reporting 0.0 when RPC fails"""
+        lamports = self._mirrored_lamports(pubkey_str, commitment)
+        if lamports is not None:
+            return lamports / 1_000_000_000
+        return await self.balance_cache.get_or_load(
+            (pubkey_str, commitment),
+            lambda: self._fetch_balance(pubkey_str, commitment),
+            ttl=self.balance_cache_ttls.get(commitment)
+        )
+
+    async def _fetch_balance(self, pubkey_str: str, commitment: Commitment) -> float:
+        pubkey = Pubkey.from_string(pubkey_str)
+        response = await self.client.get_balance(pubkey, commitment=commitment)
+        if response.value is not None:
+            return response.value / 1_000_000_000
+        return 0.0
+
+    def _mirrored_lamports(self, pubkey_str: str, commitment: Commitment) -> Optional[int]:
+        # The mirror subscribes at confirmed commitment
+        if self.account_mirror is None or commitment != Confirmed:
+            return None
+        return self.account_mirror.get_lamports(pubkey_str)
+
+    def invalidate_balances(self, *pubkey_strs: str) -> None:
+        if self.account_mirror is not None:
+            self.account_mirror.mark_stale(*pubkey_strs)
+        for pubkey_str in pubkey_strs:
+            for commitment in self.balance_cache_ttls:
+                self.balance_cache.invalidate((pubkey_str, commitment))
+
+    async def get_balances(
+        self,
+        pubkey_strs: List[str],
+        commitment: Commitment = Confirmed
+    ) -> Dict[str, float]:
+        """Fetch SOL balances for many pubkeys with batched getMultipleAccounts calls"""
+        balances = {}
+        misses = []
+        for pubkey_str in dict.fromkeys(pubkey_strs):
+            lamports = self._mirrored_lamports(pubkey_str, commitment)
+            if lamports is not None:
+                balances[pubkey_str] = lamports / 1_000_000_000
+                continue
+            cached = self.balance_cache.get((pubkey_str, commitment))
+            if cached is None:
+                misses.append(pubkey_str)
+            else:
+                balances[pubkey_str] = cached
+        
+        chunks = [
+            misses[i:i + MAX_ACCOUNTS_PER_REQUEST]
+            for i in range(0, len(misses), MAX_ACCOUNTS_PER_REQUEST)
+        ]
+        
+        results = await asyncio.gather(
+            *(self._get_balances_chunk(chunk, commitment) for chunk in chunks)
+        )
+        
+        for chunk_balances in results:
+            balances.update(chunk_balances)
+        return balances
+
+    async def _get_balances_chunk(
+        self,
+        pubkey_strs: List[str],
+        commitment: Commitment
+    ) -> Dict[str, float]:
+        balances = {pubkey_str: 0.0 for pubkey_str in pubkey_strs}
+        
+        valid = []
+        for pubkey_str in pubkey_strs:
+            try:
+                valid.append((pubkey_str, Pubkey.from_string(pubkey_str)))
+            except Exception as e:
+                logger.error(f"Invalid pubkey {pubkey_str}: {e}")
+        
+        if not valid:
+            return balances
+        
+        # Only lamports are needed, so skip the account data entirely
+        response = await self.client.get_multiple_accounts(
+            [pubkey for _, pubkey in valid],
+            commitment=commitment,
+            data_slice=DataSliceOpts(offset=0, length=0)
+        )
+        ttl = self.balance_cache_ttls.get(commitment)
+        for (pubkey_str, _), account in zip(valid, response.value):
+            if account is not None:
+                balances[pubkey_str] = account.lamports / 1_000_000_000
+            self.balance_cache.set((pubkey_str, commitment), balances[pubkey_str], ttl)
+        
+        return balances
+
+    async def get_spl_balance(self, owner_pubkey_str: str, token_mint_str: str) -> float:
+        owner_pubkey = Pubkey.from_string(owner_pubkey_str)
+        mint_pubkey = Pubkey.from_string(token_mint_str)
+        
+        from solana.rpc.types import TokenAccountOpts
+        opts = TokenAccountOpts(mint=mint_pubkey)
+        response = await self.client.get_token_accounts_by_owner(owner_pubkey, opts, commitment=Confirmed)
+        
+        if response.value:
+            account_pubkey = response.value[0].pubkey
+            balance_response = await self.client.get_token_account_balance(account_pubkey, commitment=Confirmed)
+            if balance_response.value:
+                return balance_response.value.ui_amount
+        return 0.0
     
     async def request_airdrop(self, pubkey_str: str, amount_sol: float = 1.0) -> Dict[str, Any]:
         try:
@@ -65,16 +248,20 @@ class SolanaService:
             
             if response.value:
                 signature = str(response.value)
-                await self.client.confirm_transaction(response.value, commitment=Confirmed)
+                confirmation_status = await self._confirm(response.value, Confirmed)
+                self.invalidate_balances(pubkey_str)
                 
                 return {
                     "success": True,
                     "signature": signature,
                     "amount": amount_sol,
+                    "confirmation_status": confirmation_status,
                     "explorer_url": f"https://explorer.solana.com/tx/{signature}?cluster={self.network}"
                 }
             else:
                 return {"success": False, "error": "Airdrop failed"}
+        except RpcError:
+            raise
         except Exception as e:
             logger.error(f"Airdrop error: {e}")
             return {"success": False, "error": str(e)}
@@ -104,6 +291,8 @@ class SolanaService:
                 "estimated_fee": 0.000005,
                 "final_balance": from_balance - amount_sol - 0.000005
             }
+        except RpcError:
+            raise
         except Exception as e:
             logger.error(f"Simulation error: {e}")
             return {"valid": False, "reason": str(e)}
@@ -112,7 +301,10 @@ class SolanaService:
         self,
         from_keypair: Keypair,
         to_pubkey_str: str,
-        amount_sol: float
+        amount_sol: float,
+        commitment: Commitment = Confirmed,
+        wait_for_confirmation: bool = True,
+        urgency: Optional[str] = None
     ) -> Dict[str, Any]:
         try:
             to_pubkey = Pubkey.from_string(to_pubkey_str)
@@ -126,26 +318,16 @@ class SolanaService:
                 )
             )
             
-            recent_blockhash = await self.client.get_latest_blockhash(commitment=Confirmed)
+            txn = await self._sign_transaction([transfer_ix], from_keypair, urgency)
             
-            message = Message.new_with_blockhash(
-                [transfer_ix],
-                from_keypair.pubkey(),
-                recent_blockhash.value.blockhash
-            )
-            
-            txn = Transaction.new_signed_with_payer(
-                [transfer_ix],
-                from_keypair.pubkey(),
-                [from_keypair],
-                recent_blockhash.value.blockhash
-            )
-            
-            response = await self.client.send_transaction(txn)
+            response = await self._send(txn)
             
             if response.value:
                 signature = str(response.value)
-                await self.client.confirm_transaction(response.value, commitment=Confirmed)
+                confirmation_status = "submitted"
+                if wait_for_confirmation:
+                    confirmation_status = await self._confirm(response.value, commitment)
+                    self.invalidate_balances(str(from_keypair.pubkey()), to_pubkey_str)
                 
                 return {
                     "success": True,
@@ -153,19 +335,148 @@ class SolanaService:
                     "from": str(from_keypair.pubkey()),
                     "to": to_pubkey_str,
                     "amount": amount_sol,
+                    "confirmation_status": confirmation_status,
                     "explorer_url": f"https://explorer.solana.com/tx/{signature}?cluster={self.network}"
                 }
             else:
                 return {"success": False, "error": "Transaction failed"}
+        except RpcError:
+            raise
         except Exception as e:
             logger.error(f"Transfer error: {e}")
             return {"success": False, "error": str(e)}
 
+    @staticmethod
+    def _pack_instructions(
+        instructions: List[Instruction],
+        payer: Pubkey,
+        reserved: Sequence[Instruction] = ()
+    ) -> List[List[Instruction]]:
+        """Greedily group instructions into transactions that fit in one packet.
+
+        ``reserved`` instructions count towards every batch's size but are not returned.
+        """
+        batches: List[List[Instruction]] = []
+        current: List[Instruction] = []
+        for instruction in instructions:
+            candidate = current + [instruction]
+            message = Message.new_with_blockhash([*reserved, *candidate], payer, Hash.default())
+            size = 1 + 64 * message.header.num_required_signatures + len(bytes(message))
+            if current and size > PACKET_DATA_SIZE:
+                batches.append(current)
+                current = [instruction]
+            else:
+                current = candidate
+        if current:
+            batches.append(current)
+        return batches
+
+    async def batch_transfer_sol(
+        self,
+        from_keypair: Keypair,
+        recipients: List[Tuple[str, float]],
+        commitment: Commitment = Confirmed,
+        wait_for_confirmation: bool = True,
+        urgency: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Pay many recipients with as few transactions as fit, submitted in parallel"""
+        payer = from_keypair.pubkey()
+        results: List[Optional[Dict[str, Any]]] = [None] * len(recipients)
+        instructions = []
+        instruction_recipients = []
+        
+        for index, (to_pubkey_str, amount_sol) in enumerate(recipients):
+            try:
+                instruction = transfer(
+                    TransferParams(
+                        from_pubkey=payer,
+                        to_pubkey=Pubkey.from_string(to_pubkey_str),
+                        lamports=int(amount_sol * 1_000_000_000)
+                    )
+                )
+            except Exception as e:
+                results[index] = {
+                    "to": to_pubkey_str,
+                    "amount": amount_sol,
+                    "success": False,
+                    "error": f"Invalid recipient: {e}"
+                }
+                continue
+            instructions.append(instruction)
+            instruction_recipients.append(index)
+        
+        # Compute budget instructions have fixed-size data, so placeholders size them exactly
+        reserved = (set_compute_unit_limit(0), set_compute_unit_price(0))
+        batches = []
+        offset = 0
+        for batch in self._pack_instructions(instructions, payer, reserved):
+            batches.append((batch, instruction_recipients[offset:offset + len(batch)]))
+            offset += len(batch)
+        
+        rpc_errors: List[RpcError] = []
+        
+        async def submit(batch: List[Instruction], indices: List[int]) -> Dict[str, Any]:
+            amount = sum(recipients[i][1] for i in indices)
+            try:
+                txn = await self._sign_transaction(batch, from_keypair, urgency)
+                response = await self._send(txn)
+                if not response.value:
+                    raise RuntimeError("Transaction failed")
+                signature = str(response.value)
+                confirmation_status = "submitted"
+                if wait_for_confirmation:
+                    confirmation_status = await self._confirm(response.value, commitment)
+                status = {
+                    "success": True,
+                    "signature": signature,
+                    "confirmation_status": confirmation_status,
+                    "explorer_url": f"https://explorer.solana.com/tx/{signature}?cluster={self.network}"
+                }
+            except Exception as e:
+                logger.error(f"Batch transfer error: {e}")
+                status = {"success": False, "error": str(e)}
+                if isinstance(e, RpcError):
+                    rpc_errors.append(e)
+                    if e.signature:
+                        # May still land; the caller tracks it like an unconfirmed send
+                        status["signature"] = e.signature
+                        status["confirmation_status"] = "unknown"
+            
+            for i in indices:
+                results[i] = {"to": recipients[i][0], "amount": recipients[i][1], **status}
+            return {**status, "recipients": [recipients[i][0] for i in indices], "amount": amount}
+        
+        transactions = await asyncio.gather(*(submit(batch, indices) for batch, indices in batches))
+        
+        # Nothing was sent, so surface the RPC failure; with partial success (or
+        # sends that may have landed) every transaction must be reported per recipient
+        if rpc_errors and not any(
+            transaction["success"] or transaction.get("signature") for transaction in transactions
+        ):
+            raise rpc_errors[0]
+        
+        if wait_for_confirmation:
+            self.invalidate_balances(
+                str(payer),
+                *(result["to"] for result in results if result["success"])
+            )
+        
+        return {
+            "success": all(result["success"] for result in results),
+            "from": str(payer),
+            "total_amount": sum(amount for _, amount in recipients),
+            "transactions": transactions,
+            "recipients": results
+        }
+
     async def interact_with_protocol(
         self,
         from_keypair: Keypair,
         action_type: str,
-        params: Dict[str, Any]
+        params: Dict[str, Any],
+        commitment: Commitment = Confirmed,
+        wait_for_confirmation: bool = True,
+        urgency: Optional[str] = None
     ) -> Dict[str, Any]:
         try:
             if action_type == "memo":
@@ -176,26 +487,16 @@ class SolanaService:
                     accounts=[AccountMeta(pubkey=from_keypair.pubkey(), is_signer=True, is_writable=True)]
                 )
                 
-                recent_blockhash = await self.client.get_latest_blockhash(commitment=Confirmed)
-                
-                message = Message.new_with_blockhash(
-                    [memo_ix],
-                    from_keypair.pubkey(),
-                    recent_blockhash.value.blockhash
-                )
-                
-                txn = Transaction.new_signed_with_payer(
-                    [memo_ix],
-                    from_keypair.pubkey(),
-                    [from_keypair],
-                    recent_blockhash.value.blockhash
-                )
+                txn = await self._sign_transaction([memo_ix], from_keypair, urgency)
                 
-                response = await self.client.send_transaction(txn)
+                response = await self._send(txn)
                 
                 if response.value:
                     signature = str(response.value)
-                    await self.client.confirm_transaction(response.value, commitment=Confirmed)
+                    confirmation_status = "submitted"
+                    if wait_for_confirmation:
+                        confirmation_status = await self._confirm(response.value, commitment)
+                        self.invalidate_balances(str(from_keypair.pubkey()))
                     
                     return {
                         "success": True,
@@ -203,15 +504,36 @@ class SolanaService:
                         "from": str(from_keypair.pubkey()),
                         "action": "memo",
                         "memo_text": memo_text,
+                        "confirmation_status": confirmation_status,
                         "explorer_url": f"https://explorer.solana.com/tx/{signature}?cluster={self.network}"
                     }
                 else:
                     return {"success": False, "error": "Protocol interaction failed"}
             else:
                 return {"success": False, "error": f"Unsupported protocol action: {action_type}"}
+        except RpcError:
+            raise
         except Exception as e:
             logger.error(f"Protocol interaction error: {e}")
             return {"success": False, "error": str(e)}
     
+    async def get_signature_status(self, signature_str: str) -> Dict[str, Any]:
+        try:
+            response = await self.client.get_signature_statuses(
+                [Signature.from_string(signature_str)],
+                search_transaction_history=True
+            )
+            status = response.value[0]
+            if status is None:
+                return {"signature": signature_str, "status": "unknown"}
+            if status.err is not None:
+                return {"signature": signature_str, "status": "failed", "error": str(status.err), "slot": status.slot}
+            return {"signature": signature_str, "status": confirmation_status_name(status), "slot": status.slot}
+        except Exception as e:
+            logger.error(f"Error getting signature status: {e}")
+            return {"signature": signature_str, "status": "unknown", "error": str(e)}
+    
     async def close(self):
+        await self.blockhash_provider.stop()
+        await self.fee_estimator.stop()
         await self.client.close()
\ No newline at end of file
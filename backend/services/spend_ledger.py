@@ -0,0 +1,186 @@
+import os
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+from pymongo import IndexModel, ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+LAMPORTS_PER_SOL = 1_000_000_000
+LEDGER_INDEX_KEY = [("wallet_id", ASCENDING), ("day", ASCENDING)]
+
+
+def _utc_day() -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+class SpendLedger:
+    """Per-wallet, per-UTC-day spend counters enforcing ``max_daily_spend``.
+
+    ``reserve`` checks the limit and increments the counter in a single
+    ``find_one_and_update``: the filter only matches while there is room, and
+    the upsert then collides with the unique (wallet_id, day) index when the
+    day's counter already exists but is too high. Without that index the
+    upsert would create a second counter, so limited reservations are
+    refused until the index is confirmed to exist.
+    """
+
+    INDEXES = {
+        "spend_ledger": [
+            IndexModel(LEDGER_INDEX_KEY, unique=True),
+        ],
+    }
+    HOT_QUERIES = [
+        ("spend_ledger", {"wallet_id": "", "day": ""}, None),
+    ]
+
+    def __init__(self, db, wallet_service):
+        self.db = db
+        self.wallet_service = wallet_service
+        self.ledger_collection = db.spend_ledger
+        self.limit_cache = TTLCache(
+            ttl=float(os.environ.get('SPEND_LIMIT_CACHE_TTL', 30)),
+            max_size=int(os.environ.get('SPEND_CACHE_MAX_SIZE', 10000))
+        )
+        self.spent_cache = TTLCache(
+            ttl=float(os.environ.get('SPEND_CACHE_TTL', 5)),
+            max_size=int(os.environ.get('SPEND_CACHE_MAX_SIZE', 10000))
+        )
+        self._index_verified = False
+
+    async def _has_unique_index(self) -> bool:
+        """Create the (wallet_id, day) unique index if needed and confirm it exists"""
+        if self._index_verified:
+            return True
+        try:
+            await self.ledger_collection.create_index(LEDGER_INDEX_KEY, unique=True)
+            indexes = await self.ledger_collection.index_information()
+        except Exception as e:
+            logger.error(f"Cannot verify the spend_ledger unique index: {e}")
+            return False
+        self._index_verified = any(
+            info.get("unique") and list(info["key"]) == LEDGER_INDEX_KEY
+            for info in indexes.values()
+        )
+        if not self._index_verified:
+            logger.error("spend_ledger has no unique (wallet_id, day) index")
+        return self._index_verified
+
+    async def _get_limit_lamports(self, wallet_id: str) -> Optional[int]:
+        async def load():
+            policy = await self.wallet_service.get_policy(wallet_id)
+            if not policy or policy.get("max_daily_spend") is None:
+                return None
+            return int(round(policy["max_daily_spend"] * LAMPORTS_PER_SOL))
+
+        return await self.limit_cache.get_or_load(wallet_id, load)
+
+    def invalidate_limit(self, wallet_id: str) -> None:
+        self.limit_cache.invalidate(wallet_id)
+
+    def _summary(
+        self,
+        wallet_id: str,
+        day: str,
+        spent: int,
+        limit: Optional[int]
+    ) -> Dict[str, Any]:
+        return {
+            "wallet_id": wallet_id,
+            "day": day,
+            "spent": spent / LAMPORTS_PER_SOL,
+            "limit": limit / LAMPORTS_PER_SOL if limit is not None else None,
+            "remaining": max(limit - spent, 0) / LAMPORTS_PER_SOL if limit is not None else None
+        }
+
+    async def reserve(self, wallet_id: str, amount_sol: float) -> Dict[str, Any]:
+        """Reserve ``amount_sol`` of today's allowance; returns ``allowed`` and the reservation"""
+        day = _utc_day()
+        lamports = int(round(amount_sol * LAMPORTS_PER_SOL))
+        limit = await self._get_limit_lamports(wallet_id)
+
+        if limit is not None and lamports > limit:
+            return {
+                **self._summary(wallet_id, day, self.spent_cache.get((wallet_id, day), 0), limit),
+                "allowed": False,
+                "reason": f"Amount {amount_sol} exceeds daily spend limit {limit / LAMPORTS_PER_SOL}"
+            }
+
+        if limit is not None and not await self._has_unique_index():
+            return {
+                **self._summary(wallet_id, day, self.spent_cache.get((wallet_id, day), 0), limit),
+                "allowed": False,
+                "reason": "Daily spend ledger is unavailable"
+            }
+
+        query: Dict[str, Any] = {"wallet_id": wallet_id, "day": day}
+        if limit is not None:
+            query["spent_lamports"] = {"$lte": limit - lamports}
+
+        doc = None
+        # A concurrent first reservation of the day can also collide on upsert,
+        # so one retry distinguishes that race from an exhausted allowance
+        for _ in range(2):
+            try:
+                doc = await self.ledger_collection.find_one_and_update(
+                    query,
+                    {"$inc": {"spent_lamports": lamports}},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+                break
+            except DuplicateKeyError:
+                continue
+
+        if doc is None:
+            current = await self.ledger_collection.find_one(
+                {"wallet_id": wallet_id, "day": day},
+                {"_id": 0, "spent_lamports": 1}
+            )
+            spent = current["spent_lamports"] if current else 0
+            self.spent_cache.set((wallet_id, day), spent)
+            return {
+                **self._summary(wallet_id, day, spent, limit),
+                "allowed": False,
+                "reason": "Daily spend limit exceeded"
+            }
+
+        self.spent_cache.set((wallet_id, day), doc["spent_lamports"])
+        return {
+            **self._summary(wallet_id, day, doc["spent_lamports"], limit),
+            "allowed": True,
+            "reserved_lamports": lamports
+        }
+
+    async def release(self, reservation: Dict[str, Any]) -> None:
+        """Return a reservation made by ``reserve`` after the spend failed"""
+        if not reservation.get("allowed") or not reservation.get("reserved_lamports"):
+            return
+        wallet_id, day = reservation["wallet_id"], reservation["day"]
+        try:
+            doc = await self.ledger_collection.find_one_and_update(
+                {"wallet_id": wallet_id, "day": day},
+                {"$inc": {"spent_lamports": -reservation["reserved_lamports"]}},
+                return_document=ReturnDocument.AFTER
+            )
+            if doc:
+                self.spent_cache.set((wallet_id, day), doc["spent_lamports"])
+        except Exception as e:
+            logger.error(f"Error releasing spend reservation for {wallet_id}: {e}")
+
+    async def get_daily_spend(self, wallet_id: str) -> Dict[str, Any]:
+        day = _utc_day()
+        limit = await self._get_limit_lamports(wallet_id)
+
+        async def load():
+            doc = await self.ledger_collection.find_one(
+                {"wallet_id": wallet_id, "day": day},
+                {"_id": 0, "spent_lamports": 1}
+            )
+            return doc["spent_lamports"] if doc else 0
+
+        spent = await self.spent_cache.get_or_load((wallet_id, day), load)
+        return self._summary(wallet_id, day, spent, limit)
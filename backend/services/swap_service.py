@@ -1,16 +1,64 @@
 import os
+import math
 import logging
+import importlib.util
 from typing import Dict, Any, Optional
 import httpx
 from solders.keypair import Keypair
 from solders.pubkey import Pubkey
 
+from services.cache import TTLCache
+
 logger = logging.getLogger(__name__)
 
+SOL_MINT = "So11111111111111111111111111111111111111112"
+
 class SwapService:
-    def __init__(self):
+    def __init__(self, fee_estimator=None):
         self.jupiter_api = "https://quote-api.jup.ag/v6"
         self.network = os.environ.get('SOLANA_NETWORK', 'devnet')
+        self.client: Optional[httpx.AsyncClient] = None
+        self.fee_estimator = fee_estimator
+        self.quote_cache = TTLCache(
+            ttl=float(os.environ.get('SWAP_QUOTE_CACHE_TTL', 2)),
+            max_size=int(os.environ.get('SWAP_QUOTE_CACHE_MAX_SIZE', 1000))
+        )
+        # Indicative quotes round amounts to this many significant digits
+        self.quote_bucket_digits = int(os.environ.get('SWAP_QUOTE_BUCKET_DIGITS', 2))
+    
+    def _build_client(self) -> httpx.AsyncClient:
+        http2 = os.environ.get('SWAP_HTTP2', 'true').lower() == 'true'
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("h2 is not installed, falling back to HTTP/1.1 for Jupiter API")
+            http2 = False
+        
+        limits = httpx.Limits(
+            max_connections=int(os.environ.get('SWAP_HTTP_MAX_CONNECTIONS', 100)),
+            max_keepalive_connections=int(os.environ.get('SWAP_HTTP_MAX_KEEPALIVE', 20)),
+            keepalive_expiry=float(os.environ.get('SWAP_HTTP_KEEPALIVE_EXPIRY', 30))
+        )
+        timeout = httpx.Timeout(
+            connect=float(os.environ.get('SWAP_HTTP_CONNECT_TIMEOUT', 5)),
+            read=float(os.environ.get('SWAP_HTTP_READ_TIMEOUT', 15)),
+            write=float(os.environ.get('SWAP_HTTP_WRITE_TIMEOUT', 5)),
+            pool=float(os.environ.get('SWAP_HTTP_POOL_TIMEOUT', 5))
+        )
+        return httpx.AsyncClient(http2=http2, limits=limits, timeout=timeout)
+    
+    def start(self) -> None:
+        if self.client is None:
+            self.client = self._build_client()
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        # Created lazily for callers (CLI, scripts) that never call start()
+        if self.client is None:
+            self.client = self._build_client()
+        return self.client
+    
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
     
     async def get_quote(
         self,
@@ -19,35 +67,81 @@ class SwapService:
         amount: int,
         slippage_bps: int = 50
     ) -> Dict[str, Any]:
-        """Get swap quote from Jupiter"""
+        """Get swap quote from Jupiter, served from the quote cache when fresh"""
+        key = (input_mint, output_mint, amount, slippage_bps)
+        result = await self.quote_cache.get_or_load(
+            key,
+            lambda: self._fetch_quote(input_mint, output_mint, amount, slippage_bps)
+        )
+        if not result["success"]:
+            self.quote_cache.invalidate(key)
+        return result
+    
+    def bucket_amount(self, amount: int) -> int:
+        """Round an amount to the configured number of significant digits"""
+        if amount <= 0:
+            return amount
+        exponent = int(math.floor(math.log10(amount))) - self.quote_bucket_digits + 1
+        if exponent <= 0:
+            return amount
+        step = 10 ** exponent
+        return max(step, int(round(amount / step)) * step)
+    
+    async def get_indicative_quote(
+        self,
+        input_mint: str,
+        output_mint: str,
+        amount: int,
+        slippage_bps: int = 50
+    ) -> Dict[str, Any]:
+        """Quote a bucketed amount and scale the output to the requested amount"""
+        quoted_amount = self.bucket_amount(amount)
+        result = await self.get_quote(input_mint, output_mint, quoted_amount, slippage_bps)
+        if not result["success"] or quoted_amount == amount:
+            return result
+        
+        return {
+            **result,
+            "input_amount": amount,
+            "output_amount": result["output_amount"] * amount // quoted_amount,
+            "quoted_amount": quoted_amount,
+            "indicative": True
+        }
+    
+    async def _fetch_quote(
+        self,
+        input_mint: str,
+        output_mint: str,
+        amount: int,
+        slippage_bps: int
+    ) -> Dict[str, Any]:
         try:
-            async with httpx.AsyncClient(timeout=30) as client:
-                params = {
-                    "inputMint": input_mint,
-                    "outputMint": output_mint,
-                    "amount": amount,
-                    "slippageBps": slippage_bps
+            params = {
+                "inputMint": input_mint,
+                "outputMint": output_mint,
+                "amount": amount,
+                "slippageBps": slippage_bps
+            }
+            
+            response = await self._get_client().get(
+                f"{self.jupiter_api}/quote",
+                params=params
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
+                return {
+                    "success": True,
+                    "quote": data,
+                    "input_amount": amount,
+                    "output_amount": int(data.get("outAmount", 0)),
+                    "price_impact": float(data.get("priceImpactPct", 0))
+                }
+            else:
+                return {
+                    "success": False,
+                    "error": f"Jupiter API error: {response.status_code}"
                 }
-                
-                response = await client.get(
-                    f"{self.jupiter_api}/quote",
-                    params=params
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return {
-                        "success": True,
-                        "quote": data,
-                        "input_amount": amount,
-                        "output_amount": int(data.get("outAmount", 0)),
-                        "price_impact": float(data.get("priceImpactPct", 0))
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": f"Jupiter API error: {response.status_code}"
-                    }
         except Exception as e:
             logger.error(f"Quote error: {e}")
             return {"success": False, "error": str(e)}
@@ -57,16 +151,20 @@ class SwapService:
         input_mint: str,
         output_mint: str,
         amount_in: float,
-        token_decimals: int = 9
+        token_decimals: int = 9,
+        slippage_bps: int = 50,
+        indicative: bool = False
     ) -> Dict[str, Any]:
         """Simulate a token swap"""
         try:
             amount_lamports = int(amount_in * (10 ** token_decimals))
             
-            quote_result = await self.get_quote(
+            get_quote = self.get_indicative_quote if indicative else self.get_quote
+            quote_result = await get_quote(
                 input_mint,
                 output_mint,
-                amount_lamports
+                amount_lamports,
+                slippage_bps
             )
             
             if not quote_result["success"]:
@@ -81,6 +179,7 @@ class SwapService:
                 "amount_in": amount_in,
                 "amount_out": output_amount,
                 "price_impact": quote_result["price_impact"],
+                "indicative": quote_result.get("indicative", False),
                 "quote": quote_result["quote"]
             }
         except Exception as e:
@@ -90,38 +189,43 @@ class SwapService:
     async def execute_swap(
         self,
         keypair: Keypair,
-        quote: Dict[str, Any]
+        quote: Dict[str, Any],
+        urgency: Optional[str] = None
     ) -> Dict[str, Any]:
         """Execute a swap using Jupiter API"""
         try:
             user_pubkey = str(keypair.pubkey())
             
-            async with httpx.AsyncClient(timeout=30) as client:
-                swap_request = {
-                    "quoteResponse": quote,
-                    "userPublicKey": user_pubkey,
-                    "wrapUnwrapSOL": True,
-                    "computeUnitPriceMicroLamports": 1000
-                }
-                
-                response = await client.post(
-                    f"{self.jupiter_api}/swap",
-                    json=swap_request
-                )
+            swap_request = {
+                "quoteResponse": quote,
+                "userPublicKey": user_pubkey,
+                "wrapUnwrapSOL": True
+            }
+            if self.fee_estimator is not None:
+                compute_unit_price = await self.fee_estimator.get_compute_unit_price(urgency)
+                if compute_unit_price is not None:
+                    swap_request["computeUnitPriceMicroLamports"] = compute_unit_price
+            else:
+                swap_request["computeUnitPriceMicroLamports"] = 1000
+            
+            response = await self._get_client().post(
+                f"{self.jupiter_api}/swap",
+                json=swap_request
+            )
+            
+            if response.status_code == 200:
+                swap_data = response.json()
                 
-                if response.status_code == 200:
-                    swap_data = response.json()
-                    
-                    return {
-                        "success": True,
-                        "swap_transaction": swap_data.get("swapTransaction"),
-                        "message": "Swap transaction prepared (signing not implemented in devnet demo)"
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": f"Swap API error: {response.status_code}"
-                    }
+                return {
+                    "success": True,
+                    "swap_transaction": swap_data.get("swapTransaction"),
+                    "message": "Swap transaction prepared (signing not implemented in devnet demo)"
+                }
+            else:
+                return {
+                    "success": False,
+                    "error": f"Swap API error: {response.status_code}"
+                }
         except Exception as e:
             logger.error(f"Swap execution error: {e}")
             return {"success": False, "error": str(e)}
@@ -130,13 +234,13 @@ class SwapService:
         """Return common Solana token mints"""
         if self.network == "devnet":
             return {
-                "SOL": "So11111111111111111111111111111111111111112",
+                "SOL": SOL_MINT,
                 "USDC": "4zMMC9srt5Ri5X14GAgXhaHii3GnPAEERYPJgZJDncDU",
                 "USDT": "EJwZgeZrdC8TXTQbQBoL6bfuAnFUUy1PVCMB4DYPzVaS"
             }
         else:
             return {
-                "SOL": "So11111111111111111111111111111111111111112",
+                "SOL": SOL_MINT,
                 "USDC": "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v",
                 "USDT": "Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BenwNYB",
                 "RAY": "4k3Dyjzvzp8eMZWUXbBCjEvwSkkk59S5iCNLY3QrkX6R",
@@ -149,20 +253,19 @@ class SwapService:
     ) -> Dict[str, Any]:
         """Get token price from Jupiter"""
         try:
-            async with httpx.AsyncClient(timeout=30) as client:
-                response = await client.get(
-                    f"{self.jupiter_api}/price",
-                    params={"ids": token_mint}
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return {
-                        "success": True,
-                        "price": data.get("data", {}).get(token_mint, {})
-                    }
-                else:
-                    return {"success": False, "error": "Price not available"}
+            response = await self._get_client().get(
+                f"{self.jupiter_api}/price",
+                params={"ids": token_mint}
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
+                return {
+                    "success": True,
+                    "price": data.get("data", {}).get(token_mint, {})
+                }
+            else:
+                return {"success": False, "error": "Price not available"}
         except Exception as e:
             logger.error(f"Price fetch error: {e}")
             return {"success": False, "error": str(e)}
\ No newline at end of file
@@ -1,82 +1,193 @@
 import os
 import base64
 import json
+import asyncio
 from datetime import datetime, timezone
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple, AsyncIterator
 import uuid
 from solders.keypair import Keypair
 from solders.pubkey import Pubkey
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from pymongo import IndexModel, ASCENDING, DESCENDING
 import logging
 
+from services.cache import TTLCache
+from services.crypto_executor import CryptoExecutor
+from services.pagination import fetch_page, build_projection, prefix_regex
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_ALLOWED_ACTIONS = ["transfer", "swap", "airdrop"]
+
+# Newest first; _id breaks ties between wallets created in the same instant
+WALLET_SORT = [("created_at", DESCENDING), ("_id", DESCENDING)]
+WALLET_FIELDS = ("wallet_id", "name", "pubkey", "key_management_type", "created_at")
+
 class WalletService:
-    def __init__(self, db):
+    INDEXES = {
+        "wallets": [
+            IndexModel([("wallet_id", ASCENDING)], unique=True),
+            IndexModel([("pubkey", ASCENDING)], unique=True),
+            IndexModel(WALLET_SORT),
+            IndexModel([("key_management_type", ASCENDING)] + WALLET_SORT),
+            IndexModel([("name", ASCENDING)] + WALLET_SORT),
+        ],
+        "policies": [
+            IndexModel([("wallet_id", ASCENDING)], unique=True),
+        ],
+    }
+    HOT_QUERIES = [
+        ("wallets", {"wallet_id": ""}, None),
+        ("wallets", {}, WALLET_SORT),
+        ("wallets", {"key_management_type": ""}, WALLET_SORT),
+        ("wallets", {"name": ""}, WALLET_SORT),
+        ("policies", {"wallet_id": ""}, None),
+    ]
+    
+    def __init__(self, db, crypto_executor: Optional[CryptoExecutor] = None):
         self.db = db
         self.wallets_collection = db.wallets
         self.policies_collection = db.policies
-        self.encryption_key = self._get_encryption_key()
-        self.fernet = Fernet(self.encryption_key)
-    
-    def _get_encryption_key(self) -> bytes:
-        passphrase = os.environ.get('WALLET_PASSPHRASE', 'default-dev-passphrase-change-in-prod')
-        salt = b'solana-agentic-wallet-salt'
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
+        self.crypto = crypto_executor or CryptoExecutor.from_env()
+        # Derived on first use so PBKDF2 runs in the executor, not at import time
+        self._encryption_key: Optional[bytes] = None
+        self._encryption_key_lock = asyncio.Lock()
+        # Opt-in idle TTL (seconds) per key_management_type, e.g. "encrypted:30,ephemeral:60"
+        self.keypair_cache_ttls = self._parse_keypair_cache_ttls(
+            os.environ.get('KEYPAIR_CACHE_TTLS', '')
+        )
+        self.keypair_cache = TTLCache(
+            ttl=0,
+            max_size=int(os.environ.get('KEYPAIR_CACHE_MAX_SIZE', 256)),
+            sliding=True
         )
-        key = base64.urlsafe_b64encode(kdf.derive(passphrase.encode()))
-        return key
+    
+    @staticmethod
+    def _parse_keypair_cache_ttls(spec: str) -> Dict[str, float]:
+        ttls = {}
+        for item in spec.split(','):
+            if not item.strip():
+                continue
+            key_type, _, ttl = item.partition(':')
+            ttls[key_type.strip()] = float(ttl or 0)
+        return ttls
+    
+    async def _get_encryption_key(self) -> bytes:
+        if self._encryption_key is None:
+            async with self._encryption_key_lock:
+                if self._encryption_key is None:
+                    passphrase = os.environ.get('WALLET_PASSPHRASE', 'default-dev-passphrase-change-in-prod')
+                    salt = b'solana-agentic-wallet-salt'
+                    self._encryption_key = await self.crypto.derive_key(passphrase, salt, 100000)
+        return self._encryption_key
+    
+    async def _key_for(self, key_management_type: str) -> Optional[bytes]:
+        return await self._get_encryption_key() if key_management_type == "encrypted" else None
     
     async def create_wallet(
         self,
         name: str,
         key_management_type: str = "encrypted"
     ) -> Dict[str, Any]:
-        keypair = Keypair()
-        pubkey = str(keypair.pubkey())
+        encryption_key = await self._key_for(key_management_type)
+        (pubkey, stored_key), = await self.crypto.generate_keys(1, encryption_key)
+        wallet_doc, default_policy = self._build_wallet_docs(
+            name, pubkey, stored_key, key_management_type
+        )
         
-        if key_management_type == "encrypted":
-            private_key_bytes = bytes(keypair)
-            encrypted_key = self.fernet.encrypt(private_key_bytes)
-            stored_key = base64.b64encode(encrypted_key).decode()
-        else:
-            stored_key = base64.b64encode(bytes(keypair)).decode()
+        await self.wallets_collection.insert_one(wallet_doc)
+        await self.policies_collection.insert_one(default_policy)
         
+        return self._wallet_summary(wallet_doc)
+    
+    def _build_wallet_docs(
+        self,
+        name: str,
+        pubkey: str,
+        stored_key: str,
+        key_management_type: str
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         wallet_id = str(uuid.uuid4())
+        created_at = datetime.now(timezone.utc).isoformat()
         wallet_doc = {
             "wallet_id": wallet_id,
             "name": name,
             "pubkey": pubkey,
             "encrypted_private_key": stored_key,
             "key_management_type": key_management_type,
-            "created_at": datetime.now(timezone.utc).isoformat(),
+            "created_at": created_at,
         }
-        
-        await self.wallets_collection.insert_one(wallet_doc)
-        
         default_policy = {
             "wallet_id": wallet_id,
             "max_daily_spend": float(os.environ.get('MAX_DAILY_SOL_SPEND', 10)),
-            "allowed_actions": ["transfer", "swap", "airdrop"],
+            "allowed_actions": list(DEFAULT_ALLOWED_ACTIONS),
             "require_simulation": True,
-            "created_at": datetime.now(timezone.utc).isoformat(),
+            "created_at": created_at,
         }
-        await self.policies_collection.insert_one(default_policy)
-        
+        return wallet_doc, default_policy
+    
+    @staticmethod
+    def _wallet_summary(wallet_doc: Dict[str, Any]) -> Dict[str, Any]:
         return {
-            "wallet_id": wallet_id,
-            "name": name,
-            "pubkey": pubkey,
-            "key_management_type": key_management_type,
+            "wallet_id": wallet_doc["wallet_id"],
+            "name": wallet_doc["name"],
+            "pubkey": wallet_doc["pubkey"],
+            "key_management_type": wallet_doc["key_management_type"],
             "created_at": wallet_doc["created_at"]
         }
     
+    async def provision_wallets(
+        self,
+        count: int,
+        name_prefix: str,
+        key_management_type: str = "encrypted",
+        chunk_size: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Create ``count`` wallets in bulk, yielding a progress event per chunk.
+        
+        Keys are generated and encrypted in the crypto executor while earlier
+        chunks are written with ``insert_many``; at most two chunks per worker
+        are in flight.
+        """
+        chunk_size = chunk_size or int(os.environ.get('WALLET_PROVISION_CHUNK_SIZE', 500))
+        max_in_flight = self.crypto.max_workers * 2
+        encryption_key = await self._key_for(key_management_type)
+        chunks = [
+            (start, min(chunk_size, count - start))
+            for start in range(0, count, chunk_size)
+        ]
+        
+        created = 0
+        pending = []
+        try:
+            next_chunk = 0
+            while next_chunk < len(chunks) or pending:
+                while next_chunk < len(chunks) and len(pending) < max_in_flight:
+                    start, size = chunks[next_chunk]
+                    pending.append((start, asyncio.ensure_future(self.crypto.generate_keys(size, encryption_key))))
+                    next_chunk += 1
+                
+                start, keys_future = pending.pop(0)
+                keys = await keys_future
+                docs = [
+                    self._build_wallet_docs(
+                        f"{name_prefix}-{start + offset + 1}", pubkey, stored_key, key_management_type
+                    )
+                    for offset, (pubkey, stored_key) in enumerate(keys)
+                ]
+                await self.wallets_collection.insert_many([wallet for wallet, _ in docs], ordered=False)
+                await self.policies_collection.insert_many([policy for _, policy in docs], ordered=False)
+                
+                created += len(docs)
+                yield {
+                    "created": created,
+                    "total": count,
+                    "wallets": [self._wallet_summary(wallet) for wallet, _ in docs]
+                }
+        finally:
+            # Drop queued chunks if the consumer stopped early
+            for _, keys_future in pending:
+                keys_future.cancel()
+    
     async def get_wallet(self, wallet_id: str) -> Optional[Dict[str, Any]]:
         wallet = await self.wallets_collection.find_one(
             {"wallet_id": wallet_id},
@@ -86,14 +197,84 @@ class WalletService:
             wallet.pop("encrypted_private_key", None)
         return wallet
     
-    async def get_all_wallets(self) -> List[Dict[str, Any]]:
-        wallets = await self.wallets_collection.find(
-            {},
+    async def get_wallets_by_ids(self, wallet_ids: List[str]) -> List[Dict[str, Any]]:
+        """Wallets for ``wallet_ids`` in one query; unknown ids are left out"""
+        return await self.wallets_collection.find(
+            {"wallet_id": {"$in": wallet_ids}},
             {"_id": 0, "encrypted_private_key": 0}
-        ).to_list(1000)
-        return wallets
+        ).to_list(len(wallet_ids))
+    
+    async def get_all_wallets(self) -> List[Dict[str, Any]]:
+        return [wallet async for wallet in self.stream_wallets()]
+    
+    def _build_query(
+        self,
+        name_prefix: Optional[str] = None,
+        key_management_type: Optional[str] = None
+    ) -> Dict[str, Any]:
+        query: Dict[str, Any] = {}
+        if name_prefix:
+            query["name"] = prefix_regex(name_prefix)
+        if key_management_type:
+            query["key_management_type"] = key_management_type
+        return query
+    
+    async def get_wallets_page(
+        self,
+        name_prefix: Optional[str] = None,
+        key_management_type: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Return one page of wallets, newest first, and a cursor for the next page"""
+        projection, extra = build_projection(fields, WALLET_FIELDS, WALLET_SORT)
+        wallets, next_cursor = await fetch_page(
+            self.wallets_collection,
+            self._build_query(name_prefix, key_management_type),
+            WALLET_SORT,
+            limit,
+            cursor,
+            projection
+        )
+        for wallet in wallets:
+            for field in extra:
+                wallet.pop(field, None)
+        return {"wallets": wallets, "next_cursor": next_cursor}
+    
+    async def stream_wallets(
+        self,
+        name_prefix: Optional[str] = None,
+        key_management_type: Optional[str] = None,
+        fields: Optional[List[str]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield matching wallets straight from the Motor cursor, newest first"""
+        projection, _ = build_projection(fields, WALLET_FIELDS, [])
+        projection["_id"] = 0
+        cursor = self.wallets_collection.find(
+            self._build_query(name_prefix, key_management_type),
+            projection
+        ).sort(WALLET_SORT).batch_size(1000)
+        async for wallet in cursor:
+            yield wallet
     
     async def get_keypair(self, wallet_id: str) -> Keypair:
+        if not self.keypair_cache_ttls:
+            keypair, _ = await self._load_keypair(wallet_id)
+            return keypair
+        
+        keypair, _ = await self.keypair_cache.get_or_load(
+            wallet_id,
+            lambda: self._load_keypair(wallet_id),
+            ttl=lambda loaded: self.keypair_cache_ttls.get(loaded[1], 0)
+        )
+        return keypair
+    
+    def evict_keypair(self, wallet_id: str) -> None:
+        """Drop a cached keypair; call on wallet deletion or key rotation"""
+        self.keypair_cache.invalidate(wallet_id)
+    
+    async def _load_keypair(self, wallet_id: str) -> Tuple[Keypair, str]:
         wallet = await self.wallets_collection.find_one(
             {"wallet_id": wallet_id},
             {"_id": 0}
@@ -106,12 +287,12 @@ class WalletService:
         key_bytes = base64.b64decode(stored_key)
         
         if wallet["key_management_type"] == "encrypted":
-            decrypted = self.fernet.decrypt(key_bytes)
+            decrypted = await self.crypto.decrypt(await self._get_encryption_key(), key_bytes)
             keypair = Keypair.from_bytes(decrypted)
         else:
             keypair = Keypair.from_bytes(key_bytes)
         
-        return keypair
+        return keypair, wallet["key_management_type"]
     
     async def update_policy(
         self,
@@ -94,14 +94,30 @@ export default function Dashboard() {
   const [stats, setStats] = useState({
     totalWallets: 0,
     totalAgents: 0,
-    totalTransactions: 0,
-    totalBalance: 0
+    totalTransactions: 0
   });
+  const [balances, setBalances] = useState({});
   const [activities, setActivities] = useState([]);
   const [loading, setLoading] = useState(true);
   
   useEffect(() => {
     loadDashboardData();
+    
+    // Balance changes and new audit entries are pushed over SSE; the data is
+    // reloaded whenever the stream (re)connects or drops events
+    const source = new EventSource(`${API}/events`);
+    source.addEventListener("open", () => loadDashboardData());
+    source.addEventListener("lagged", () => loadDashboardData());
+    source.addEventListener("audit", (event) => {
+      const log = JSON.parse(event.data);
+      setActivities(prev => [log, ...prev].slice(0, 5));
+    });
+    source.addEventListener("balance", (event) => {
+      const { pubkey, balance } = JSON.parse(event.data);
+      setBalances(prev => pubkey in prev ? { ...prev, [pubkey]: balance } : prev);
+    });
+    
+    return () => source.close();
   }, []);
   
   const loadDashboardData = async () => {
@@ -113,14 +129,13 @@ export default function Dashboard() {
       ]);
       
       const wallets = walletsRes.data;
-      const totalBalance = wallets.reduce((sum, w) => sum + (w.balances?.SOL || 0), 0);
       
       setStats({
         totalWallets: wallets.length,
         totalAgents: agentsRes.data.length,
-        totalTransactions: logsRes.data.length,
-        totalBalance: totalBalance.toFixed(4)
+        totalTransactions: logsRes.data.length
       });
+      setBalances(Object.fromEntries(wallets.map(w => [w.pubkey, w.balances?.SOL || 0])));
       
       setActivities(logsRes.data);
       setLoading(false);
@@ -131,6 +146,8 @@ export default function Dashboard() {
     }
   };
   
+  const totalBalance = Object.values(balances).reduce((sum, balance) => sum + balance, 0);
+  
   if (loading) {
     return (
       <div className="flex items-center justify-center h-96" data-testid="loading-spinner">
@@ -172,7 +189,7 @@ export default function Dashboard() {
         <StatCard 
           icon={Shield}
           label="Total Balance"
-          value={`${stats.totalBalance} SOL`}
+          value={`${totalBalance.toFixed(4)} SOL`}
           color="green"
         />
       </div>
@@ -79,8 +79,26 @@ export default function Transactions() {
   
   useEffect(() => {
     loadTransactions();
-    const interval = setInterval(loadTransactions, 5000);
-    return () => clearInterval(interval);
+    
+    // New audit entries and confirmations for every wallet are pushed over SSE;
+    // the list is reloaded whenever the stream (re)connects or drops events
+    const source = new EventSource(`${API}/events`);
+    source.addEventListener("open", () => loadTransactions());
+    source.addEventListener("lagged", () => loadTransactions());
+    source.addEventListener("audit", (event) => {
+      const log = JSON.parse(event.data);
+      setLogs(prev => [log, ...prev].slice(0, 50));
+    });
+    source.addEventListener("confirmation", (event) => {
+      const entry = JSON.parse(event.data);
+      setLogs(prev => prev.map(log =>
+        log.result?.signature === entry.signature
+          ? { ...log, confirmation_status: entry.status, success: !entry.error }
+          : log
+      ));
+    });
+    
+    return () => source.close();
   }, []);
   
   const loadTransactions = async () => {
@@ -194,6 +194,22 @@ export default function Wallets() {
   
   useEffect(() => {
     loadWallets();
+    
+    // Balance changes are pushed over SSE; the list is reloaded whenever the
+    // stream (re)connects or drops events
+    const source = new EventSource(`${API}/events`);
+    source.addEventListener("open", () => loadWallets());
+    source.addEventListener("lagged", () => loadWallets());
+    source.addEventListener("balance", (event) => {
+      const { pubkey, balance } = JSON.parse(event.data);
+      setWallets(prev => prev.map(wallet =>
+        wallet.pubkey === pubkey
+          ? { ...wallet, balances: { ...wallet.balances, SOL: balance } }
+          : wallet
+      ));
+    });
+    
+    return () => source.close();
   }, []);
   
   const loadWallets = async () => {
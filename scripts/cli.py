@@ -15,6 +15,9 @@ from services.wallet_service import WalletService
 from services.agent_service import AgentService
 from services.solana_service import SolanaService
 from services.audit_service import AuditService
+from services.auth_service import AuthService
+from services.index_manager import IndexManager
+from services.spend_ledger import SpendLedger
 
 app = typer.Typer()
 
@@ -22,10 +25,11 @@ def get_services():
     mongo_url = os.environ['MONGO_URL']
     client = AsyncIOMotorClient(mongo_url)
     db = client[os.environ['DB_NAME']]
+    wallet_service = WalletService(db)
     
     return (
-        WalletService(db),
-        AgentService(db, WalletService(db)),
+        wallet_service,
+        AgentService(db, wallet_service),
         SolanaService(),
         AuditService(db),
         client
@@ -42,16 +46,43 @@ def create_wallet(name: str, key_type: str = "encrypted"):
     
     asyncio.run(_create())
 
+@app.command()
+def provision_wallets(
+    count: int,
+    name_prefix: str = "agent",
+    key_type: str = "encrypted",
+    chunk_size: int = 500,
+    output: Optional[str] = None
+):
+    """Create many wallets at once, optionally writing them to an NDJSON file"""
+    async def _provision():
+        wallet_service, _, _, _, client = get_services()
+        out = open(output, "w") if output else None
+        try:
+            async for progress in wallet_service.provision_wallets(
+                count, name_prefix, key_type, chunk_size=chunk_size
+            ):
+                if out:
+                    for wallet in progress["wallets"]:
+                        out.write(json.dumps(wallet) + "\n")
+                print(f"Created {progress['created']}/{progress['total']} wallets", file=sys.stderr)
+        finally:
+            if out:
+                out.close()
+            client.close()
+    
+    asyncio.run(_provision())
+
 @app.command()
 def list_wallets():
     """List all wallets"""
     async def _list():
         wallet_service, _, solana_service, _, client = get_services()
         wallets = await wallet_service.get_all_wallets()
+        balances = await solana_service.get_balances([w['pubkey'] for w in wallets])
         
         for wallet in wallets:
-            balance = await solana_service.get_balance(wallet['pubkey'])
-            wallet['balance'] = balance
+            wallet['balance'] = balances.get(wallet['pubkey'], 0.0)
         
         print(json.dumps(wallets, indent=2))
         await solana_service.close()
@@ -116,5 +147,24 @@ def audit_logs(wallet_id: Optional[str] = None, limit: int = 20):
     
     asyncio.run(_logs())
 
+@app.command()
+def ensure_indexes(check_plans: bool = True):
+    """Create database indexes and report hot queries that still scan"""
+    async def _ensure():
+        wallet_service, agent_service, _, audit_service, client = get_services()
+        db = client[os.environ['DB_NAME']]
+        index_manager = IndexManager(
+            db,
+            [wallet_service, agent_service, audit_service, AuthService(db), SpendLedger(db, wallet_service)]
+        )
+        created = await index_manager.ensure_indexes()
+        print(json.dumps(created, indent=2))
+        if check_plans:
+            report = await index_manager.check_query_plans()
+            print(json.dumps(report, indent=2, default=str))
+        client.close()
+    
+    asyncio.run(_ensure())
+
 if __name__ == "__main__":
     app()
\ No newline at end of file
@@ -56,10 +56,9 @@ async def main():
         print(f"  ✓ Funded wallet 2: {airdrop2['explorer_url']}")
     
     print("\n[3] Checking balances...")
-    balance1 = await solana_service.get_balance(wallet1['pubkey'])
-    balance2 = await solana_service.get_balance(wallet2['pubkey'])
-    print(f"  Wallet 1 Balance: {balance1} SOL")
-    print(f"  Wallet 2 Balance: {balance2} SOL")
+    balances = await solana_service.get_balances([wallet1['pubkey'], wallet2['pubkey']])
+    print(f"  Wallet 1 Balance: {balances[wallet1['pubkey']]} SOL")
+    print(f"  Wallet 2 Balance: {balances[wallet2['pubkey']]} SOL")
     
     print("\n[4] Creating AI agents...")
     
@@ -147,10 +146,9 @@ async def main():
             print(f"  ✗ Swap failed: {swap_result.get('error')}")
     
     print("\n[8] Final balances...")
-    final_balance1 = await solana_service.get_balance(wallet1['pubkey'])
-    final_balance2 = await solana_service.get_balance(wallet2['pubkey'])
-    print(f"  Wallet 1: {final_balance1} SOL")
-    print(f"  Wallet 2: {final_balance2} SOL")
+    final_balances = await solana_service.get_balances([wallet1['pubkey'], wallet2['pubkey']])
+    print(f"  Wallet 1: {final_balances[wallet1['pubkey']]} SOL")
+    print(f"  Wallet 2: {final_balances[wallet2['pubkey']]} SOL")
     
     print("\n[9] Audit trail...")
     logs = await audit_service.get_logs(limit=5)